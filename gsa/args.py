@@ -1,8 +1,41 @@
 from __future__ import annotations
 
 import argparse
+import importlib
+import os
 import typing
 
+
+class LazySubParsersAction(argparse._SubParsersAction):
+    """Sub-commands whose modules are imported when they are used.
+
+    A lazy sub-command gets an empty stub parser, so it shows up in
+    usage and help. When it is selected on the command line, we import
+    the module that defines it, and its @command fills in the stub."""
+
+    _lazy: dict[str, str]
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._lazy = {}
+
+    def add_lazy(self, name: str, module: str) -> None:
+        self._lazy[name] = module
+        self.add_parser(name)
+
+    def load(self, name: str) -> None:
+        module = self._lazy.pop(name, None)
+        if module is not None:
+            importlib.import_module(module)
+
+    def __call__(self, parser: argparse.ArgumentParser,
+                 namespace: argparse.Namespace,
+                 values: typing.Any,
+                 option_string: str | None = None) -> None:
+        self.load(values[0])
+        super().__call__(parser, namespace, values, option_string)
+
+
 ARGS_ROOT = argparse.ArgumentParser(
     description='''
         Helper tool for exercises in Genome Scale Algorithms.
@@ -14,12 +47,67 @@ ARGS_ROOT.add_argument(
     action='store_true',
     default=False
 )
-SUBCOMMANDS = ARGS_ROOT.add_subparsers()
+ARGS_ROOT.add_argument(
+    '--cache-dir',
+    help="Directory for cached preprocessing "
+         "(default $GSA_CACHE_DIR or ~/.cache/gsa).",
+    type=str,
+    default=None
+)
+ARGS_ROOT.add_argument(
+    '--no-cache',
+    help="Don't use or update the preprocessing cache.",
+    action='store_true',
+    default=False
+)
+ARGS_ROOT.add_argument(
+    '--timings',
+    help="Report the wall and CPU time of each phase of the command "
+         "on stderr.",
+    action='store_true',
+    default=False
+)
+ARGS_ROOT.add_argument(
+    '--timings-json',
+    help="Write the time of each phase of the command to this file "
+         "as JSON.",
+    metavar='FILE',
+    type=str,
+    default=None
+)
+ARGS_ROOT.add_argument(
+    '--progress',
+    help="Report progress on stderr while searching or preprocessing.",
+    action='store_true',
+    default=False
+)
+SUBCOMMANDS = typing.cast(
+    LazySubParsersAction,
+    ARGS_ROOT.add_subparsers(action=LazySubParsersAction)
+)
 
 
 CommandHandler = typing.Callable[[argparse.Namespace], None]
 
 
+def is_dir_path(string: str) -> str:
+    if os.path.isdir(string):
+        return string
+    else:
+        raise argparse.ArgumentTypeError(f"{string}) is not a directory")
+
+
+def non_negative_int(string: str) -> int:
+    try:
+        n = int(string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"{string} is not an integer") from None
+    if n < 0:
+        raise argparse.ArgumentTypeError(f"{string} is negative")
+    return n
+
+
 class argument:
     flags: tuple[str, ...]
     options: dict[str, typing.Any]
@@ -34,7 +122,7 @@ class command:
     _parent: argparse._SubParsersAction
 
     _parser: typing.Optional[argparse.ArgumentParser]
-    _subparsers: typing.Optional[argparse._SubParsersAction]
+    _subparsers: typing.Optional[LazySubParsersAction]
 
     _cmd: typing.Optional[typing.Callable[[argparse.Namespace], None]]
 
@@ -49,9 +137,14 @@ class command:
         self._cmd = None
 
     def __call__(self, cmd: CommandHandler) -> command:
-        parser = self._parent.add_parser(
-            cmd.__name__, description=cmd.__doc__
-        )
+        # Fill in the stub parser if this is a lazy command
+        parser = self._parent.choices.get(cmd.__name__)
+        if parser is None:
+            parser = self._parent.add_parser(
+                cmd.__name__, description=cmd.__doc__
+            )
+        else:
+            parser.description = cmd.__doc__
         for arg in self._args:
             parser.add_argument(*arg.flags, **arg.options)
         parser.set_defaults(command=cmd)
@@ -65,9 +158,12 @@ class command:
         return self._parser
 
     @property
-    def subparsers(self) -> argparse._SubParsersAction:
+    def subparsers(self) -> LazySubParsersAction:
         if self._subparsers is None:
-            self._subparsers = self.parser.add_subparsers()
+            self._subparsers = typing.cast(
+                LazySubParsersAction,
+                self.parser.add_subparsers(action=LazySubParsersAction)
+            )
         return self._subparsers
 
     @property
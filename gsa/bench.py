@@ -0,0 +1,178 @@
+"""In-process microbenchmarks of the search engines.
+
+gsa perf times whole processes, so for small inputs interpreter
+startup and imports swamp the algorithms. Here we run the engines in
+search_methods directly, on simulated data held in memory, and time
+each phase of a search separately:
+
+    parse       reading the genome and reads from FASTA/FASTQ text
+    preprocess  building the engine's tables for each chromosome
+    load        reading the tables back from their stored form
+    search      searching for all reads in all chromosomes
+    output      writing the hits as SAM records
+
+Each phase is repeated in a loop long enough to be timed reliably
+(see timeit) and we report the best of a few such loops.
+"""
+
+from __future__ import annotations
+
+import typing
+import io
+import time
+import random
+import pickle
+
+from . import fasta
+from . import fastq
+from . import sam
+from . import simulate
+from . import search_methods
+from .search_methods import Engine
+from .vis import Table, L, R
+
+PHASES = ["parse", "preprocess", "load", "search", "output"]
+
+Hit = tuple[str, str, int, str, str]  # read name, chromosome, pos, cigar, read
+
+
+class Dataset(typing.NamedTuple):
+    fasta: str
+    fastq: str
+    edits: int
+
+
+def simulate_dataset(k: int, n: int, num: int, length: int, edits: int,
+                     seed: int) -> Dataset:
+    random.seed(seed)
+    fasta_f, fastq_f = io.StringIO(), io.StringIO()
+    simulate.simulate_genome(k, n, fasta_f)
+    fasta_f.seek(0)
+    simulate.simulate_reads(num, length, edits, fasta_f, fastq_f)
+    return Dataset(fasta_f.getvalue(), fastq_f.getvalue(), edits)
+
+
+def timeit(f: typing.Callable[[], typing.Any],
+           min_time: float, repeats: int) -> float:
+    """Nanoseconds per call of f.
+
+    We double the number of calls per loop until a loop takes at
+    least min_time seconds, and then return the fastest of repeats
+    such loops."""
+    loops = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            f()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(repeats - 1):
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            f()
+        best = min(best, time.perf_counter_ns() - start)
+    return best / loops
+
+
+def parse(data: Dataset) -> tuple[dict[str, str], list[tuple[str, str]]]:
+    genome = fasta.read_fasta(io.StringIO(data.fasta))
+    reads = list(fastq.scan_reads(io.StringIO(data.fastq)))
+    return genome, reads
+
+
+def bench_engine(engine: Engine, approx: bool, data: Dataset,
+                 min_time: float, repeats: int) -> dict[str, float | None]:
+    """Nanoseconds spent in each phase; None for phases the engine
+    doesn't have."""
+    res: dict[str, float | None] = dict.fromkeys(PHASES)
+    res["parse"] = timeit(lambda: parse(data), min_time, repeats)
+    genome, reads = parse(data)
+
+    def preprocess() -> dict[str, typing.Any]:
+        prep = engine.prep
+        return {chrname: prep(seq) if prep else seq
+                for chrname, seq in genome.items()}
+
+    tables = preprocess()
+    if engine.prep is not None:
+        res["preprocess"] = timeit(preprocess, min_time, repeats)
+        if engine.storable:
+            stored = pickle.dumps(tables)
+            res["load"] = timeit(lambda: pickle.loads(stored),
+                                 min_time, repeats)
+
+    searchers = {chrname: engine.searcher(x) for chrname, x in tables.items()}
+
+    def search() -> list[Hit]:
+        hits: list[Hit] = []
+        if engine.batched:
+            for i in range(0, len(reads), search_methods.VECTOR_BATCH):
+                batch = reads[i:i + search_methods.VECTOR_BATCH]
+                batch_hits = search_methods.search_batch(searchers, batch)
+                for (readname, read), read_hits in zip(batch, batch_hits):
+                    for chrname in searchers:
+                        for pos in read_hits[chrname]:
+                            hits.append((readname, chrname, pos,
+                                         f'{len(read)}M', read))
+            return hits
+        for readname, read in reads:
+            for chrname, searcher in searchers.items():
+                if approx:
+                    for pos, cigar in searcher(read, data.edits):
+                        hits.append((readname, chrname, pos, cigar, read))
+                else:
+                    for pos in searcher(read):
+                        hits.append((readname, chrname, pos,
+                                     f'{len(read)}M', read))
+        return hits
+
+    res["search"] = timeit(search, min_time, repeats)
+    hits = search()
+
+    def output() -> None:
+        out = io.StringIO()
+        for hit in hits:
+            sam.ssam_record(out, *hit)
+
+    res["output"] = timeit(output, min_time, repeats)
+    return res
+
+
+def engines(names: list[str]) -> list[tuple[str, Engine, bool]]:
+    """The engines to benchmark, as (label, engine, approx) triples."""
+    everything = \
+        [(f"exact {e.name}", e, False)
+         for e in search_methods.exact_engines] + \
+        [(f"approx {e.name}", e, True)
+         for e in search_methods.approx_engines]
+    if not names:
+        return everything
+    return [(label, e, approx) for label, e, approx in everything
+            if label in names or e.name in names]
+
+
+def format_ns(ns: float | None) -> str:
+    if ns is None:
+        return "-"
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("µs", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.3g} {unit}"
+    return f"{ns:.3g} ns"
+
+
+def bench(selected: list[tuple[str, Engine, bool]], data: Dataset,
+          min_time: float, repeats: int,
+          progress: typing.Callable[[str], None] | None = None) -> Table:
+    tbl = Table(L, *(R for _ in PHASES), R)
+    tbl.append_row("Engine", *PHASES, "total")
+    for label, engine, approx in selected:
+        if progress:
+            progress(label)
+        res = bench_engine(engine, approx, data, min_time, repeats)
+        total = sum(t for t in res.values() if t is not None)
+        tbl.append_row(label, *(format_ns(res[p]) for p in PHASES),
+                       format_ns(total))
+    return tbl
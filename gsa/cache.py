@@ -0,0 +1,187 @@
+"""Content-addressed cache for preprocessed genomes.
+
+Entries are keyed by a hash of everything that determines their
+content (the genome's bytes, the preprocessing method, its parameters
+and the file format version), so the same genome preprocessed anywhere
+on the machine maps to the same entry. Each entry is a data file,
+`<key>.data`, and a JSON file, `<key>.json`, describing it. We use the
+data file's modification time as the time it was last used, and evict
+the least recently used entries when the cache exceeds its byte limit.
+"""
+
+import typing
+import argparse
+import os
+import os.path
+import json
+import time
+import hashlib
+import tempfile
+
+from . import utils
+
+# Bump this whenever the layout of cached data changes.
+FORMAT_VERSION = 2
+
+DEFAULT_LIMIT = '2G'
+
+
+class Entry(typing.NamedTuple):
+    key: str
+    path: str
+    size: int
+    last_used: float
+    meta: dict[str, typing.Any]
+
+
+def default_dir() -> str:
+    """Cache directory from $GSA_CACHE_DIR, or the user's cache dir."""
+    if 'GSA_CACHE_DIR' in os.environ:
+        return os.environ['GSA_CACHE_DIR']
+    cache_home = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'gsa')
+
+
+def cache_root(args: argparse.Namespace) -> str | None:
+    """The cache directory, or None if caching is off (--no-cache)."""
+    if args.no_cache:
+        return None
+    return typing.cast(str, args.cache_dir or default_dir())
+
+
+def default_limit() -> int:
+    """Cache size limit from $GSA_CACHE_LIMIT (default 2G)."""
+    return utils.parse_size(os.environ.get('GSA_CACHE_LIMIT', DEFAULT_LIMIT))
+
+
+def file_digest(fname: str) -> str:
+    """SHA-256 of a file's content."""
+    h = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def make_key(**parts: typing.Any) -> str:
+    """Hash the (JSON-serialisable) parts that identify an entry."""
+    parts['format_version'] = FORMAT_VERSION
+    desc = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(desc.encode()).hexdigest()
+
+
+def _data_path(root: str, key: str) -> str:
+    return os.path.join(root, f"{key}.data")
+
+
+def _meta_path(root: str, key: str) -> str:
+    return os.path.join(root, f"{key}.json")
+
+
+def _umask() -> int:
+    # We can only read the umask by setting it
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def _atomic_write(root: str, fname: str,
+                  write: typing.Callable[[typing.BinaryIO], typing.Any]
+                  ) -> None:
+    # Write to a temporary file in the same directory and rename it
+    # into place, so readers never see a partially written file.
+    fd, tmp = tempfile.mkstemp(dir=root, prefix='.tmp-')
+    try:
+        # mkstemp makes the file owner-only; give it the permissions
+        # a plain open would, so the cache (and the datasets we link
+        # from it) can be shared.
+        os.fchmod(fd, 0o666 & ~_umask())
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp, fname)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def lookup(root: str, key: str) -> str | None:
+    """Path to the data for key, if it is in the cache."""
+    path = _data_path(root, key)
+    try:
+        os.utime(path)  # Mark as recently used
+    except FileNotFoundError:
+        return None  # Not there, or evicted as we looked
+    except OSError:
+        pass  # A read-only cache is still a cache
+    return path if os.path.isfile(path) else None
+
+
+def store(root: str, key: str,
+          write: typing.Callable[[typing.BinaryIO], typing.Any],
+          meta: dict[str, typing.Any],
+          limit: int | None = None) -> str:
+    """Atomically add an entry to the cache and return its data path.
+
+    After adding the entry, least recently used entries are evicted
+    until the cache is within limit (default from default_limit()).
+    """
+    os.makedirs(root, exist_ok=True)
+    path = _data_path(root, key)
+    _atomic_write(root, path, write)
+    meta = dict(meta, key=key, created=time.time())
+    _atomic_write(root, _meta_path(root, key),
+                  lambda f: f.write(json.dumps(meta).encode()))
+    prune(root, default_limit() if limit is None else limit, keep=key)
+    return path
+
+
+def entries(root: str) -> list[Entry]:
+    """All entries in the cache, least recently used first."""
+    if not os.path.isdir(root):
+        return []
+    res: list[Entry] = []
+    for fname in os.listdir(root):
+        key, ext = os.path.splitext(fname)
+        if ext != '.data':
+            continue
+        try:
+            with open(_meta_path(root, key)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        path = _data_path(root, key)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue  # Evicted by another process since listdir
+        res.append(Entry(key, path, st.st_size, st.st_mtime, meta))
+    res.sort(key=lambda e: e.last_used)
+    return res
+
+
+def remove(root: str, key: str) -> None:
+    for path in (_data_path(root, key), _meta_path(root, key)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # Already removed, perhaps by another process
+
+
+def prune(root: str, limit: int, keep: str | None = None) -> list[Entry]:
+    """Evict least recently used entries until the cache uses at most
+    limit bytes. The entry with key keep is never evicted.
+
+    Returns the evicted entries."""
+    current = entries(root)
+    total = sum(e.size for e in current)
+    evicted: list[Entry] = []
+    for entry in current:
+        if total <= limit:
+            break
+        if entry.key == keep:
+            continue
+        remove(root, entry.key)
+        total -= entry.size
+        evicted.append(entry)
+    return evicted
@@ -0,0 +1,24 @@
+"""The gsa sub-commands.
+
+Each command lives in its own module, and the modules are only
+imported when their command is used (see args.LazySubParsersAction),
+so running one command doesn't pay for importing all the others.
+"""
+
+from ..args import SUBCOMMANDS
+
+# Top-level commands and the modules that define them, in the order
+# they are listed in the help.
+COMMANDS = {
+    'show': 'gsa.show',
+    'simulate': 'gsa.commands.simulate',
+    'preprocess': 'gsa.commands.preprocess',
+    'search': 'gsa.commands.search',
+    'test': 'gsa.commands.test',
+    'perf': 'gsa.commands.perf',
+    'bench': 'gsa.commands.bench',
+    'cache': 'gsa.commands.cache',
+}
+
+for name, module in COMMANDS.items():
+    SUBCOMMANDS.add_lazy(name, module)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from ..args import command, argument
+from .. import messages
+from .. import bench as gsa_bench
+
+
+@command(
+    argument("-k", "--chromosomes",
+             help="Number of chromosomes to simulate (default 2).",
+             type=int, default=2),
+    argument("-n", "--length",
+             help="Length of each chromosome (default 2000).",
+             type=int, default=2000),
+    argument("-r", "--reads",
+             help="Number of reads to simulate (default 100).",
+             type=int, default=100),
+    argument("-l", "--read-length",
+             help="Length of each read (default 20).",
+             type=int, default=20),
+    argument("-e", "--edits",
+             help="Edits in the reads, and allowed in approximative "
+                  "search (default 0).",
+             type=int, default=0),
+    argument("--seed",
+             help="Random seed for the simulated data (default 0).",
+             type=int, default=0),
+    argument("--min-time",
+             help="Minimum seconds per timing loop (default 0.2).",
+             type=float, default=0.2),
+    argument("--loops",
+             help="Timing loops per phase; we report the fastest "
+                  "(default 3).",
+             type=int, default=3),
+    argument("-o", "--out",
+             help="Report file (default stdout).",
+             type=argparse.FileType('w'), default=sys.stdout),
+    argument("engines",
+             help="Engines to benchmark, e.g. bwt or 'exact kmp' "
+                  "(default all).",
+             nargs='*'),
+)
+def bench(args: argparse.Namespace) -> None:
+    """Benchmark the search engines in-process, phase by phase."""
+    selected = gsa_bench.engines(args.engines)
+    if not selected:
+        messages.error(f"No engines match {' '.join(args.engines)}")
+    data = gsa_bench.simulate_dataset(
+        args.chromosomes, args.length, args.reads, args.read_length,
+        args.edits, args.seed
+    )
+    progress = (lambda label: messages.message(f"benchmarking {label}")) \
+        if args.verbose else None
+    print(gsa_bench.bench(selected, data, args.min_time, args.loops,
+                          progress),
+          file=args.out)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import typing
+import argparse
+import time
+
+from ..args import command, argument
+from .. import messages
+from .. import cache as prep_cache
+from .. import utils
+from ..vis import Table, L, R
+
+
+@command()
+def cache(args: argparse.Namespace) -> None:
+    """Manage the cache of preprocessed genomes.
+
+    Choose a sub-command."""
+    cache.parser.print_usage()
+
+
+def cache_dir(args: argparse.Namespace) -> str:
+    return typing.cast(str, args.cache_dir or prep_cache.default_dir())
+
+
+@command(
+    parent=cache.subparsers
+)
+def ls(args: argparse.Namespace) -> None:
+    """List the entries in the cache, least recently used first."""
+    tbl = Table(L, L, R, L, L)
+    tbl.append_row("Key", "Method", "Size", "Last used", "Genome")
+    total = 0
+    for entry in prep_cache.entries(cache_dir(args)):
+        tbl.append_row(
+            entry.key[:12],
+            entry.meta.get('method', '?'),
+            utils.format_size(entry.size),
+            time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.last_used)),
+            entry.meta.get('genome', '?')
+        )
+        total += entry.size
+    print(tbl)
+    print(f"\n{len(tbl) - 1} entries, {utils.format_size(total)} " +
+          f"in {cache_dir(args)}")
+
+
+@command(
+    argument("-l", "--limit",
+             help="Size to prune the cache down to "
+                  "(default $GSA_CACHE_LIMIT or " +
+                  f"{prep_cache.DEFAULT_LIMIT}).",
+             type=utils.parse_size, default=None),
+    argument("-a", "--all",
+             help="Remove all entries.",
+             action='store_true', default=False),
+    parent=cache.subparsers
+)
+def prune(args: argparse.Namespace) -> None:
+    """Evict least recently used entries from the cache."""
+    limit = 0 if args.all else \
+        args.limit if args.limit is not None else prep_cache.default_limit()
+    evicted = prep_cache.prune(cache_dir(args), limit)
+    if args.verbose:
+        for entry in evicted:
+            messages.message(f"Removed {entry.key[:12]} " +
+                             f"({entry.meta.get('method', '?')}, " +
+                             f"{entry.meta.get('genome', '?')})")
+    freed = sum(entry.size for entry in evicted)
+    print(f"Removed {len(evicted)} entries, {utils.format_size(freed)}.")
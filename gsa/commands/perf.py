@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import yaml
+
+from ..args import command, argument, is_dir_path
+from .. import cache
+from .. import messages
+from .. import profiling
+from .. import tool_perf, perf_results
+
+
+@command(
+    argument("-n", "--repeats",
+             help="Number of measurements to make per run (default 5).",
+             type=int, default=5),
+    argument("-j", "--jobs",
+             help="Number of measurements to run concurrently, each "
+                  "pinned to its own CPUs (default 1).",
+             type=int, default=1),
+    argument("-w", "--warmup",
+             help="Number of unmeasured warm-up runs per measurement "
+                  "(default 1).",
+             type=int, default=1),
+    argument("--shuffle",
+             help="Run measurements in random order (default).",
+             action=argparse.BooleanOptionalAction, default=True),
+    argument("--seed",
+             help="Random seed for the order of runs.",
+             type=int, default=None),
+    argument("-t", "--timeout",
+             help="Kill runs that take more than this many seconds, "
+                  "and skip the tool on larger parameters.",
+             type=float, default=None),
+    argument("--adaptive",
+             help="Repeat cells until the 95%% confidence interval of "
+                  "their mean wall time is within this fraction of the "
+                  "mean, e.g. 5%%.",
+             type=perf_results.parse_tolerance, default=None),
+    argument("--budget",
+             help="Seconds to spend on adaptive repeats per phase, "
+                  "after the first --repeats runs (default 300).",
+             type=float, default=300.0),
+    argument("--raw",
+             help="Report every measurement instead of summaries.",
+             action='store_true', default=False),
+    argument("-p", "--preprocess-report",
+             help="Report file for preprocessing (default stdout).",
+             type=argparse.FileType('w'), default=sys.stdout),
+    argument("-m", "--mapping-report",
+             help="Report file for mapping (default stdout).",
+             type=argparse.FileType('w'), default=sys.stdout),
+    argument("--profile",
+             help="After measuring, run each gsa tool once more under "
+                  "the profiler and write the profiles to "
+                  "__PERF__/tools/<tool>/profile/.",
+             choices=profiling.MODES, default=None),
+    argument("-c", "--complexity-report",
+             help="Report file for estimated scaling exponents "
+                  "(default stdout).",
+             type=argparse.FileType('w'), default=sys.stdout),
+    argument("--json",
+             help="Write all measurements to a JSON file.",
+             type=argparse.FileType('w'), default=None),
+    argument("--csv",
+             help="Write all measurements to a CSV file.",
+             type=argparse.FileType('w'), default=None),
+    argument("-b", "--baseline",
+             help="JSON results (from --json) to compare against. "
+                  "Exits with status 2 if there are regressions.",
+             type=argparse.FileType('r'), default=None),
+    argument("--tolerance",
+             help="Slowdown relative to the baseline that we accept "
+                  "before reporting a regression (default 10%%).",
+             type=perf_results.parse_tolerance, default="10%"),
+    argument("-d", "--dir",
+             help="Relative directory. Default is directory of config file.",
+             type=is_dir_path, default=None),
+    argument('config',
+             help="Configuration file",
+             type=argparse.FileType('r')),
+)
+def perf(args: argparse.Namespace) -> None:
+    """Run a preformance comparison of the tools specified
+    in the configuration file."""
+    config = tool_perf.perf_config(
+        yaml.load(args.config.read(), Loader=yaml.SafeLoader),
+        args.dir,
+        args.config.name
+    )
+    options = tool_perf.perf_options(
+        repeats=args.repeats,
+        jobs=args.jobs,
+        warmup=args.warmup,
+        shuffle=args.shuffle,
+        seed=args.seed,
+        raw=args.raw,
+        profile=args.profile,
+        timeout=args.timeout,
+        adaptive=args.adaptive,
+        budget=args.budget
+    )
+    # Read the baseline first, so we don't find out that it is
+    # broken after running all the measurements.
+    baseline = perf_results.read_json(args.baseline) \
+        if args.baseline else None
+
+    tool_perf.perf_setup(
+        config, cache.cache_root(args), args.verbose
+    )
+    phases = [
+        tool_perf.perf_preprocess(
+            config, options, args.preprocess_report, args.verbose
+        ),
+        tool_perf.perf_map(
+            config, options, args.mapping_report, args.verbose
+        ),
+    ]
+    print(tool_perf.complexity_report(phases), file=args.complexity_report)
+
+    records = perf_results.records(phases)
+    if args.json:
+        perf_results.write_json(records, args.json)
+    if args.csv:
+        perf_results.write_csv(records, args.csv)
+    if baseline is not None:
+        tbl, regressions = perf_results.compare(
+            records, baseline, args.tolerance, sys.stdout.isatty()
+        )
+        print(tbl)
+        if regressions:
+            messages.warning(
+                f"{regressions} measurements regressed by more than " +
+                f"{args.tolerance:.0%}"
+            )
+            sys.exit(2)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import typing
+import argparse
+import os
+
+from ..args import command, argument
+from .. import messages
+from .. import search_methods
+from .. import utils
+
+
+def preprocess_wrapper(
+    f: typing.Callable[[str], None]
+) -> typing.Callable[[argparse.Namespace], None]:
+    def preprocess(args: argparse.Namespace) -> None:
+        if not os.access(args.genome, os.R_OK):
+            messages.error(f"Can't open genome file {args.genome}")
+        f(args.genome)
+    return preprocess
+
+
+@command(
+    argument("genome", help="Genome to preprocess (FASTA file).",
+             type=str),
+    argument("-t", "--threads",
+             help="Number of chromosomes to preprocess in parallel "
+                  "(default 1).",
+             type=int, default=1),
+    argument("-m", "--max-memory",
+             help="Build the index in external memory, using roughly "
+                  "this much memory (e.g. 500M).",
+             type=utils.parse_size, default=None)
+)
+def preprocess(args: argparse.Namespace) -> None:
+    """Preprocess a genome.
+
+    Select the algorithm to preprocess for."""
+    preprocess.parser.print_usage()
+
+
+for algo in search_methods.preprocess:
+    parser = preprocess.subparsers.add_parser(
+        algo.__name__.lower(), help=algo.__doc__,
+    )
+    parser.set_defaults(command=algo)
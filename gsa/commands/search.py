@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from ..args import command, argument
+from .. import search_methods
+from .. import utils
+
+
+@command(
+    argument("genome", help="Genome to search in (FASTA file).",
+             type=str),
+    argument("reads", help="Reads to search for (FASTQ file).",
+             type=str),
+    argument("-o", "--out",
+             help="File to write results in (default stdout).",
+             type=argparse.FileType('w'), default=sys.stdout),
+    argument("-m", "--max-memory",
+             help="If the genome isn't preprocessed, build the index in "
+                  "external memory, using roughly this much memory.",
+             type=utils.parse_size, default=None),
+    argument("--stats",
+             help="Write statistics about the reads, their hits and "
+                  "how long each read took to this file (JSON).",
+             metavar="FILE", type=str, default=None),
+)
+def search(args: argparse.Namespace) -> None:
+    """Search genome for reads.
+
+    Choose a sub-command to specify which type of search.
+    """
+    # This is a menu point. There's not any action in it.
+    # If called, we just inform the user to pick a sub-command.
+    search.parser.print_usage()
+
+
+@command(
+    parent=search.subparsers
+)
+def exact(args: argparse.Namespace) -> None:
+    """Run an exact pattern matching algorithm.
+
+    Select the algorithm to run."""
+    exact.parser.print_usage()
+
+
+for algo in search_methods.exact_search:
+    parser = exact.subparsers.add_parser(
+        algo.__name__.lower(), help=algo.__doc__,
+    )
+    parser.set_defaults(command=algo)
+
+
+@command(
+    argument("-e", "--edits",
+             help="Number of edits to allow (default 1).",
+             type=int, default=1),
+    parent=search.subparsers
+)
+def approx(args: argparse.Namespace) -> None:
+    """Run an approximative pattern matching algorithm.
+
+    Select the algorithm to run."""
+    approx.parser.print_usage()
+
+
+for algo in search_methods.approx_search:
+    parser = approx.subparsers.add_parser(
+        algo.__name__.lower(), help=algo.__doc__,
+    )
+    parser.set_defaults(command=algo)
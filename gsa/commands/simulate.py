@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+import sys
+
+from ..args import command, argument
+from .. import simulate as sim
+
+
+@command()
+def simulate(args: argparse.Namespace) -> None:
+    """Simulates data for GSA exercises.
+
+    Choose a sub-command to specify which type of data.
+    """
+    # This is a menu point. There's not any action in it.
+    # If called, we just inform the user to pick a sub-command.
+    simulate.parser.print_usage()
+
+
+@command(
+    argument("k", help="Number of chromosomes to simulate.", type=int),
+    argument("n", help="Lenght of each chromosome.", type=int),
+    argument("-o", "--out",
+             help="Fasta file to write the genome to (default stdout).",
+             type=argparse.FileType('w'), default=sys.stdout),
+    parent=simulate.subparsers
+)
+def genome(args: argparse.Namespace) -> None:
+    """Simulates genome data."""
+    sim.simulate_genome(args.k, args.n, args.out)
+
+
+@command(
+    argument("genome", help="Genome to sample from.",
+             type=argparse.FileType('r')),
+    argument("k", help="Number of reads.", type=int),
+    argument("n", help="Lenght of each read.", type=int),
+    argument("-e", "--edits", help="Number of edits to allow (default 0).",
+             type=int, default=0),
+    argument("-o", "--out",
+             help="Fastq file to write the reads to (default stdout).",
+             type=argparse.FileType('w'), default=sys.stdout),
+    parent=simulate.subparsers
+)
+def reads(args: argparse.Namespace) -> None:
+    """Simulates reads data."""
+    sim.simulate_reads(args.k, args.n, args.edits,
+                       args.genome, args.out)
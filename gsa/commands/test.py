@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import yaml
+
+from ..args import command, argument, is_dir_path
+from .. import cache
+from .. import tool_tests
+
+
+@command(
+    argument("-o", "--out",
+             help="Report file (default stdout).",
+             type=argparse.FileType('w'), default=sys.stdout),
+    argument("-j", "--jobs",
+             help="Number of tool commands to run concurrently (default 1).",
+             type=int, default=1),
+    argument("-f", "--force",
+             help="Rerun all tool commands, even those whose input and "
+                  "command haven't changed since their last run.",
+             action='store_true', default=False),
+    argument("-d", "--dir",
+             help="Relative directory. Default is directory of config file.",
+             type=is_dir_path, default=None),
+    argument('config',
+             help="Configuration file",
+             type=argparse.FileType('r')),
+)
+def test(args: argparse.Namespace) -> None:
+    """Run a test by comparing the output from the tools specified
+    in the configuration file."""
+    config = tool_tests.test_config(
+        yaml.load(args.config.read(), Loader=yaml.SafeLoader),
+        args.dir,
+        args.config.name
+    )
+    tool_tests.test_setup(
+        config, cache.cache_root(args), args.verbose
+    )
+    tool_tests.test_preprocess(config, args.jobs, args.force, args.verbose)
+    tool_tests.test_map(config, args.jobs, args.force, args.verbose)
+    res = tool_tests.test_compare(config, args.out, args.verbose)
+    sys.exit(0 if res else 2)
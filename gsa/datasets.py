@@ -0,0 +1,160 @@
+"""Simulated datasets for gsa test and gsa perf, cached between runs.
+
+Simulating large genomes and read sets can take longer than the tests
+we use them for, so we keep them in the cache (see cache.py), keyed by
+the simulation parameters, the seed and the simulator version. Every
+config file that asks for the same dataset gets the same file, and we
+only simulate the datasets that aren't in the cache yet.
+"""
+
+from __future__ import annotations
+
+import typing
+import os
+import os.path
+import io
+import sys
+import random
+import shutil
+import tempfile
+import concurrent.futures
+
+from . import cache
+from . import simulate
+from . import messages
+from . import utils
+
+GenomeParams = tuple[int, int]           # chromosomes, length
+ReadsParams = tuple[int, int, int]       # number, length, edits
+
+
+def genome_key(k: int, n: int, seed: int) -> str:
+    return cache.make_key(
+        dataset='genome', chromosomes=k, length=n,
+        seed=seed, simulator=simulate.VERSION
+    )
+
+
+def reads_key(k: int, n: int, num: int, length: int, e: int,
+              seed: int) -> str:
+    return cache.make_key(
+        dataset='reads', chromosomes=k, length=n,
+        reads=num, read_length=length, edits=e,
+        seed=seed, simulator=simulate.VERSION
+    )
+
+
+def _store(root: str, key: str, text: str, name: str) -> str:
+    # We don't prune here; other workers may be adding entries we
+    # haven't linked to yet. The caller prunes when all are in place.
+    return cache.store(
+        root, key, lambda f: f.write(text.encode()),
+        {'method': 'simulated', 'genome': name}, limit=sys.maxsize
+    )
+
+
+def _simulate_genome(root: str, k: int, n: int, seed: int) -> str:
+    random.seed(f"genome-{k}-{n}-{seed}")
+    out = io.StringIO()
+    simulate.simulate_genome(k, n, out)
+    return _store(root, genome_key(k, n, seed), out.getvalue(),
+                  utils.genome_name(n, k))
+
+
+def _simulate_reads(root: str, genome: str, k: int, n: int,
+                    num: int, length: int, e: int, seed: int) -> str:
+    random.seed(f"reads-{k}-{n}-{num}-{length}-{e}-{seed}")
+    out = io.StringIO()
+    with open(genome) as f:
+        simulate.simulate_reads(num, length, e, f, out)
+    return _store(root, reads_key(k, n, num, length, e, seed),
+                  out.getvalue(), utils.reads_name(n, k, num, length, e))
+
+
+def _run_missing(jobs: dict[str, tuple[typing.Callable[..., str],
+                                       tuple[typing.Any, ...]]],
+                 paths: dict[str, str],
+                 verbose: bool) -> None:
+    "Run the simulations in jobs in parallel, adding their paths."
+    if not jobs:
+        return
+    with concurrent.futures.ProcessPoolExecutor() as pool:
+        futures = {
+            pool.submit(f, *fargs): name
+            for name, (f, fargs) in jobs.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            name = futures[future]
+            if verbose:
+                messages.message(f"Simulated {name}")
+            paths[name] = future.result()
+
+
+def _link(src: str, dst: str) -> None:
+    "Hard link src to dst, or copy it if we can't link across devices."
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def setup(base: str,
+          tools: typing.Iterable[str],
+          genomes: list[GenomeParams],
+          genomes_reads: list[tuple[GenomeParams, ReadsParams]],
+          seed: int,
+          root: str | None,
+          verbose: bool) -> None:
+    """Set up the data and tool directories under base.
+
+    The datasets are hard linked from the cache at root into
+    base/data, simulating those that aren't cached, and symlinked
+    into each tool's directory. If root is None, we don't cache
+    the datasets."""
+    utils.check_make_dir(base, verbose)
+    utils.check_make_dir(f'{base}/data', verbose)
+    utils.check_make_dir(f'{base}/tools', verbose)
+    for tool in tools:
+        utils.check_make_dir(f'{base}/tools/{utils.tool_dir(tool)}', verbose)
+
+    with tempfile.TemporaryDirectory(dir=base) as tmp:
+        store = root if root is not None else tmp
+        paths: dict[str, str] = {}
+
+        # The reads are sampled from the genomes, so we need those first
+        missing: dict[str, tuple[typing.Callable[..., str],
+                                 tuple[typing.Any, ...]]] = {}
+        for k, n in genomes:
+            name = utils.genome_name(n, k)
+            path = cache.lookup(store, genome_key(k, n, seed))
+            if path is None:
+                missing[name] = (_simulate_genome, (store, k, n, seed))
+            else:
+                paths[name] = path
+        _run_missing(missing, paths, verbose)
+
+        missing = {}
+        for (k, n), (num, length, e) in genomes_reads:
+            name = utils.reads_name(n, k, num, length, e)
+            path = cache.lookup(store, reads_key(k, n, num, length, e, seed))
+            if path is None:
+                genome = paths[utils.genome_name(n, k)]
+                missing[name] = (
+                    _simulate_reads,
+                    (store, genome, k, n, num, length, e, seed)
+                )
+            else:
+                paths[name] = path
+        _run_missing(missing, paths, verbose)
+
+        for name, path in paths.items():
+            _link(path, f'{base}/data/{name}')
+            for tool in tools:
+                utils.relink(f"../../data/{name}",
+                             f'{base}/tools/{utils.tool_dir(tool)}/{name}')
+
+    # The links keep the data alive even if we evict it now.
+    if root is not None:
+        cache.prune(root, cache.default_limit())
@@ -0,0 +1,319 @@
+"""External-memory construction of FM-indices for exact search.
+
+The in-memory preprocessing needs a chromosome and all its tables in
+memory at the same time. Here we never hold more than a bounded
+number of suffixes in memory: the suffix array is sorted in blocks
+that are spilled to disk and then merged, and the BWT and the O-table
+checkpoints are streamed to the index file as the merged suffix array
+comes out.
+
+The index file starts with MAGIC, followed by, for each chromosome,
+a BWT, an O-table checkpoint and a suffix array section. A JSON
+trailer describes where the sections are, and the last eight bytes
+of the file hold the offset of the trailer. Searching memory-maps the
+file, so it only pages in the parts of the index it touches.
+"""
+
+from __future__ import annotations
+
+import typing
+import os
+import os.path
+import mmap
+import json
+import array
+import heapq
+import itertools
+import tempfile
+
+MAGIC = b'GSAEXT01'
+SENTINEL = 0
+
+# Number of BWT positions between O-table checkpoints
+CHECKPOINT_STEP = 128
+
+# Rough cost of sorting one suffix in memory (the index, its key
+# object and the list slot), used to turn a memory budget into a
+# block size.
+BYTES_PER_SUFFIX = 128
+MIN_BLOCK = 1024
+
+# Bytes per entry in the suffix array and O-table sections.
+ENTRY_SIZE = array.array('q').itemsize
+
+
+def is_index(fname: str) -> bool:
+    with open(fname, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+# SECTION Sorting suffixes without materialising them
+
+class _Suffix:
+    """Sort key for the suffix of text starting at i.
+
+    Compares suffixes a chunk at a time, doubling the chunk size, so
+    we only look at as much of the suffixes as we need to."""
+    __slots__ = ('text', 'i')
+
+    def __init__(self, text: mmap.mmap, i: int) -> None:
+        self.text = text
+        self.i = i
+
+    def __lt__(self, other: _Suffix) -> bool:
+        text, i, j, k = self.text, self.i, other.i, 16
+        while True:
+            a, b = text[i:i+k], text[j:j+k]
+            if a != b:
+                return a < b
+            # The sentinel is unique, so two different suffixes
+            # will differ before either of them runs out.
+            i, j, k = i + k, j + k, 2 * k
+
+
+def _write_ints(f: typing.BinaryIO, xs: typing.Iterable[int]) -> None:
+    array.array('q', xs).tofile(f)
+
+
+def _read_ints(fname: str, chunk: int) -> typing.Iterator[int]:
+    with open(fname, 'rb') as f:
+        while True:
+            buf = array.array('q')
+            try:
+                buf.fromfile(f, chunk)
+            except EOFError:
+                pass  # we get what was left in buf
+            if not buf:
+                return
+            yield from buf
+
+
+def _sorted_runs(text: mmap.mmap, n: int, block: int,
+                 workdir: str) -> list[str]:
+    "Sort blocks of suffixes and spill them to disk."
+    runs: list[str] = []
+    for start in range(0, n, block):
+        run = sorted(range(start, min(start + block, n)),
+                     key=lambda i: _Suffix(text, i))
+        fname = os.path.join(workdir, f"run-{len(runs)}")
+        with open(fname, 'wb') as f:
+            _write_ints(f, run)
+        runs.append(fname)
+    return runs
+
+
+def _merged_sa(text: mmap.mmap, runs: list[str], block: int
+               ) -> typing.Iterator[int]:
+    "Merge sorted runs into the suffix array."
+    chunk = max(1, block // max(1, len(runs)))
+    return heapq.merge(
+        *(_read_ints(run, chunk) for run in runs),
+        key=lambda i: _Suffix(text, i)
+    )
+
+# !SECTION
+
+# SECTION Building the index
+
+
+def _split_fasta(genome: str, workdir: str
+                 ) -> typing.Iterator[tuple[str, str]]:
+    """Stream the chromosomes in a FASTA file to separate files.
+
+    Yields chromosome names and file names, with the sentinel appended
+    to the sequences. Only one line of the genome is in memory at a
+    time."""
+    out: typing.BinaryIO | None = None
+    name = ""
+
+    def close() -> typing.Iterator[tuple[str, str]]:
+        if out is not None:
+            out.write(bytes([SENTINEL]))
+            out.close()
+            yield name, out.name
+
+    with open(genome, 'rb') as f:
+        for line in f:
+            if line.startswith(b'>'):
+                yield from close()
+                name = line[1:].split()[0].decode()
+                out = open(os.path.join(workdir, "chromosome"), 'wb')
+            elif out is not None:
+                out.write(b''.join(line.split()))
+        yield from close()
+
+
+def _byte_counts(text: mmap.mmap, chunk: int) -> list[int]:
+    counts = [0] * 256
+    for start in range(0, len(text), chunk):
+        buf = text[start:start+chunk]
+        for a in set(buf):
+            counts[a] += buf.count(a)
+    return counts
+
+
+class _Writer:
+    "Keeps track of offsets while writing the index sequentially."
+    f: typing.BinaryIO
+    offset: int
+
+    def __init__(self, f: typing.BinaryIO) -> None:
+        self.f = f
+        self.offset = 0
+
+    def write(self, data: bytes) -> None:
+        self.f.write(data)
+        self.offset += len(data)
+
+    def align(self) -> None:
+        self.write(b'\0' * (-self.offset % ENTRY_SIZE))
+
+    def copy(self, fname: str, chunk: int) -> int:
+        "Copy a file into the index, returning its offset."
+        self.align()
+        start = self.offset
+        with open(fname, 'rb') as f:
+            for buf in iter(lambda: f.read(chunk), b''):
+                self.write(buf)
+        return start
+
+
+def _build_chromosome(text_fname: str, out: _Writer,
+                      max_memory: int, workdir: str) -> dict[str, typing.Any]:
+    block = max(MIN_BLOCK, max_memory // BYTES_PER_SUFFIX)
+    chunk = max(CHECKPOINT_STEP, max_memory // 4)
+
+    with open(text_fname, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as text:
+        n = len(text)
+        counts = _byte_counts(text, chunk)
+        alphabet = [a for a in range(256) if counts[a]]
+        ctable = list(itertools.accumulate(
+            (counts[a] for a in alphabet[:-1]), initial=0
+        ))
+
+        # Merge the sorted runs, writing the suffix array and the BWT
+        # to separate files as we go.
+        runs = _sorted_runs(text, n, block, workdir)
+        sa_fname = os.path.join(workdir, "sa")
+        bwt_fname = os.path.join(workdir, "bwt")
+        with open(sa_fname, 'wb') as sa_f, open(bwt_fname, 'wb') as bwt_f:
+            sa_buf, bwt_buf = array.array('q'), bytearray()
+            for i in _merged_sa(text, runs, block):
+                sa_buf.append(i)
+                bwt_buf.append(text[i - 1] if i > 0 else SENTINEL)
+                if len(sa_buf) >= block:
+                    sa_buf.tofile(sa_f)
+                    bwt_f.write(bwt_buf)
+                    sa_buf, bwt_buf = array.array('q'), bytearray()
+            sa_buf.tofile(sa_f)
+            bwt_f.write(bwt_buf)
+        for run in runs:
+            os.remove(run)
+
+    # O-table checkpoints: the symbol counts in bwt[:k*CHECKPOINT_STEP]
+    # for k = 0, ..., n // CHECKPOINT_STEP.
+    occ_fname = os.path.join(workdir, "occ")
+    with open(bwt_fname, 'rb') as bwt_f, open(occ_fname, 'wb') as occ_f:
+        occ = [0] * len(alphabet)
+        while True:
+            _write_ints(occ_f, occ)
+            buf = bwt_f.read(CHECKPOINT_STEP)
+            if len(buf) < CHECKPOINT_STEP:
+                break
+            for r, a in enumerate(alphabet):
+                occ[r] += buf.count(a)
+
+    section = {
+        'n': n,
+        'alphabet': alphabet,
+        'ctable': ctable,
+        'step': CHECKPOINT_STEP,
+        'bwt': out.copy(bwt_fname, chunk),
+        'occ': out.copy(occ_fname, chunk),
+        'sa': out.copy(sa_fname, chunk),
+    }
+    for fname in (sa_fname, bwt_fname, occ_fname):
+        os.remove(fname)
+    return section
+
+
+def build_index(genome: str, f: typing.BinaryIO, max_memory: int) -> None:
+    """Build FM-indices for all chromosomes in genome and write them to f.
+
+    The construction keeps roughly max_memory bytes of suffixes in
+    memory and spills the rest to temporary files."""
+    out = _Writer(f)
+    out.write(MAGIC)
+    sections: dict[str, dict[str, typing.Any]] = {}
+    with tempfile.TemporaryDirectory(prefix='gsa-') as workdir:
+        for chrname, text_fname in _split_fasta(genome, workdir):
+            sections[chrname] = \
+                _build_chromosome(text_fname, out, max_memory, workdir)
+            os.remove(text_fname)
+
+    trailer = out.offset
+    out.write(json.dumps({'chromosomes': sections}).encode())
+    out.write(trailer.to_bytes(ENTRY_SIZE, 'little'))
+
+# !SECTION
+
+# SECTION Searching
+
+
+class Index:
+    """FM-index for one chromosome, backed by a memory-mapped file."""
+
+    def __init__(self, mm: mmap.mmap, section: dict[str, typing.Any]) -> None:
+        n = section['n']
+        self.n = n
+        self.step = section['step']
+        self.alphabet: list[int] = section['alphabet']
+        self.ctable: list[int] = section['ctable']
+        self.symbols = [bytes([a]) for a in self.alphabet]
+        self.rank = [-1] * 256
+        for r, a in enumerate(self.alphabet):
+            self.rank[a] = r
+
+        view = memoryview(mm)
+        sigma = len(self.alphabet)
+        noccs = (n // self.step + 1) * sigma
+        self.bwt = mm
+        self.bwt_offset = section['bwt']
+        self.occ = view[section['occ']:section['occ'] + noccs * ENTRY_SIZE]\
+            .cast('q')
+        self.sa = view[section['sa']:section['sa'] + n * ENTRY_SIZE].cast('q')
+
+    def _o(self, r: int, i: int) -> int:
+        "Number of occurrences of symbol r in bwt[:i]."
+        k = i // self.step
+        start = self.bwt_offset + k * self.step
+        return int(self.occ[k * len(self.alphabet) + r]) + \
+            self.bwt[start:self.bwt_offset + i].count(self.symbols[r])
+
+    def search(self, p: str) -> typing.Iterator[int]:
+        left, right = 0, self.n
+        for a in reversed(p.encode()):
+            r = self.rank[a]
+            if r < 0:
+                return
+            left = self.ctable[r] + self._o(r, left)
+            right = self.ctable[r] + self._o(r, right)
+            if left >= right:
+                return
+        for i in range(left, right):
+            yield self.sa[i]
+
+
+def read_index(fname: str) -> dict[str, Index]:
+    with open(fname, 'rb') as f:
+        # The map stays valid after we close the file
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    trailer = int.from_bytes(mm[-ENTRY_SIZE:], 'little')
+    header = json.loads(mm[trailer:-ENTRY_SIZE])
+    return {
+        chrname: Index(mm, section)
+        for chrname, section in header['chromosomes'].items()
+    }
+
+# !SECTION
@@ -3,7 +3,7 @@ import typing
 from .vis import cols
 
 
-def error(*args: typing.Any, **kwargs: typing.Any) -> None:
+def error(*args: typing.Any, **kwargs: typing.Any) -> typing.NoReturn:
     print(cols.bright_red("ERROR:"), *args, **kwargs, file=sys.stderr)
     sys.exit(1)
 
@@ -0,0 +1,189 @@
+"""Machine-readable perf results and comparison against a baseline.
+
+The JSON format is a list of records, one per tool and parameter
+tuple, holding every measurement we made:
+
+    {"version": 1, "results": [
+        {"phase": "map", "tool": "bwt",
+         "params": {"no_chrom": 2, "chrom_len": 1000, ...},
+         "measurements": [{"wall": 0.31, "user": 0.28, ...}, ...]},
+        ...
+    ]}
+
+Measurements we couldn't make are stored as null.
+"""
+
+from __future__ import annotations
+
+import typing
+import csv
+import json
+import math
+import argparse
+
+from . import messages
+from . import perf_stats
+from .tool_perf import Phase, Measurement, METRICS, MAP_PARAMS, OK, failed
+from .vis import Table, ColSpec
+from .vis.cols import Colour, green, red, plain
+
+FORMAT_VERSION = 1
+
+# The metrics we check for regressions against a baseline
+BASELINE_METRICS = ["wall", "maxrss"]
+
+
+class Record(typing.NamedTuple):
+    phase: str
+    tool: str
+    params: dict[str, int]
+    measurements: list[Measurement]
+
+    @property
+    def key(self) -> tuple[str, str, tuple[tuple[str, int], ...]]:
+        return self.phase, self.tool, tuple(self.params.items())
+
+
+def records(phases: list[Phase]) -> list[Record]:
+    return [
+        Record(phase.name, tool,
+               {name: x for (name, _), x in zip(phase.params, cell)},
+               measurements)
+        for phase in phases
+        for (tool, cell), measurements in phase.results.items()
+    ]
+
+
+def _to_json(x: typing.Any) -> typing.Any:
+    return None if isinstance(x, float) and math.isnan(x) else x
+
+
+def _from_json(x: typing.Any) -> typing.Any:
+    return math.nan if x is None else x
+
+
+def write_json(recs: list[Record], f: typing.TextIO) -> None:
+    json.dump({
+        'version': FORMAT_VERSION,
+        'results': [
+            {
+                'phase': rec.phase,
+                'tool': rec.tool,
+                'params': rec.params,
+                'measurements': [
+                    {k: _to_json(v) for k, v in m._asdict().items()}
+                    for m in rec.measurements
+                ],
+            }
+            for rec in recs
+        ]
+    }, f, indent=2)
+    f.write("\n")
+
+
+def read_json(f: typing.TextIO) -> list[Record]:
+    try:
+        data = json.load(f)
+        if data.get('version') != FORMAT_VERSION:
+            messages.error(
+                f"Unknown perf results version in {f.name}: " +
+                f"{data.get('version')}"
+            )
+        return [
+            Record(
+                rec['phase'], rec['tool'], rec['params'],
+                [Measurement(**{k: _from_json(v) for k, v in m.items()})
+                 for m in rec['measurements']]
+            )
+            for rec in data['results']
+        ]
+    except (ValueError, KeyError, TypeError) as err:
+        messages.error(f"Malformed perf results in {f.name}: {err}")
+
+
+def write_csv(recs: list[Record], f: typing.TextIO) -> None:
+    """Write one row per measurement. Parameters a phase doesn't have
+    are left empty."""
+    params = [name for name, _ in MAP_PARAMS]
+    writer = csv.writer(f)
+    writer.writerow(
+        ["phase", "tool"] + params + ["repeat"] + list(Measurement._fields)
+    )
+    for rec in recs:
+        for i, m in enumerate(rec.measurements):
+            row: list[typing.Any] = [rec.phase, rec.tool]
+            row += [rec.params.get(name, "") for name in params]
+            row += [i] + ["" if v is None else v for v in map(_to_json, m)]
+            writer.writerow(row)
+
+
+def parse_tolerance(tolerance: str) -> float:
+    """Parse a tolerance such as 10% or 0.1 into a fraction."""
+    try:
+        if tolerance.endswith('%'):
+            return float(tolerance[:-1]) / 100
+        return float(tolerance)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid tolerance: {tolerance}") from None
+
+
+def compare(current: list[Record], baseline: list[Record],
+            tolerance: float, coloured: bool) -> tuple[Table, int]:
+    """Compare the medians of the current measurements with the baseline.
+
+    Returns a table of the changes and the number of regressions,
+    i.e., cells that got more than tolerance slower (or bigger), or
+    that we measured in the baseline but couldn't measure now (they
+    timed out, were skipped or failed)."""
+    faster = green if coloured else plain
+    slower = red if coloured else plain
+    params = [name for name, _ in MAP_PARAMS]
+    headers = ["Phase", "Tool"] + [header for _, header in MAP_PARAMS] + \
+        ["Measure", "Baseline", "Current", "Change"]
+    tbl = Table(*(ColSpec(right_pad=", ") for _ in headers[:-1]),
+                ColSpec())
+    tbl.append_row(*headers)
+
+    old = {rec.key: rec for rec in baseline}
+    regressions = 0
+    for rec in current:
+        if rec.key not in old:
+            continue
+        for metric, header, scale in METRICS:
+            if metric not in BASELINE_METRICS:
+                continue
+            new_median = perf_stats.summarise(
+                getattr(m, metric) for m in rec.measurements).median
+            old_median = perf_stats.summarise(
+                getattr(m, metric) for m in old[rec.key].measurements).median
+            if math.isnan(old_median):
+                continue
+            if math.isnan(new_median):
+                status = failed(rec.measurements)
+                regressions += 1
+                tbl.append_row(
+                    rec.phase, rec.tool,
+                    *(str(rec.params.get(name, "")) for name in params),
+                    header, f"{old_median / scale:.6g}",
+                    slower("failed" if status == OK else status.lower()),
+                    slower("regression")
+                )
+                continue
+            if old_median == 0:
+                continue
+            ratio = new_median / old_median
+            col: Colour = plain
+            if ratio > 1 + tolerance:
+                col = slower
+                regressions += 1
+            elif ratio < 1 - tolerance:
+                col = faster
+            tbl.append_row(
+                rec.phase, rec.tool,
+                *(str(rec.params.get(name, "")) for name in params),
+                header,
+                f"{old_median / scale:.6g}", f"{new_median / scale:.6g}",
+                col(f"{ratio - 1:+.1%}")
+            )
+    return tbl, regressions
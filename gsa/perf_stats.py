@@ -0,0 +1,109 @@
+"""Summary statistics for performance measurements."""
+
+import typing
+import math
+
+
+class Summary(typing.NamedTuple):
+    n: int
+    median: float
+    min: float
+    iqr: float
+    outliers: list[float]
+
+
+def quantile(xs: typing.Sequence[float], q: float) -> float:
+    """The q-quantile of xs, interpolating linearly between data points.
+
+    xs must be sorted."""
+    if not xs:
+        return math.nan
+    pos = q * (len(xs) - 1)
+    i = math.floor(pos)
+    j = min(i + 1, len(xs) - 1)
+    return xs[i] + (xs[j] - xs[i]) * (pos - i)
+
+
+def summarise(xs: typing.Iterable[float]) -> Summary:
+    """Summarise measurements.
+
+    Measurements more than 1.5 IQR below the first quartile or above
+    the third quartile (Tukey's fences) are flagged as outliers."""
+    data = sorted(x for x in xs if not math.isnan(x))
+    if not data:
+        return Summary(0, math.nan, math.nan, math.nan, [])
+    q1, q3 = quantile(data, 0.25), quantile(data, 0.75)
+    iqr = q3 - q1
+    lo, hi = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    return Summary(
+        len(data), quantile(data, 0.5), data[0], iqr,
+        [x for x in data if x < lo or x > hi]
+    )
+
+
+# Two-sided 95% quantiles of Student's t distribution, for 1 to 30
+# degrees of freedom. Beyond that we use the normal distribution.
+_T95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+
+def t95(df: int) -> float:
+    return _T95[df - 1] if df <= len(_T95) else 1.960
+
+
+def relative_ci_width(xs: typing.Sequence[float]) -> float:
+    """Width of the 95% confidence interval of the mean of xs,
+    relative to the mean. Infinite if we can't tell."""
+    data = [x for x in xs if not math.isnan(x)]
+    n = len(data)
+    if n < 2:
+        return math.inf
+    mean = sum(data) / n
+    if mean <= 0:
+        return math.inf
+    var = sum((x - mean) ** 2 for x in data) / (n - 1)
+    return 2 * t95(n - 1) * math.sqrt(var / n) / mean
+
+
+class Fit(typing.NamedTuple):
+    slope: float
+    lo: float  # 95% confidence interval for the slope
+    hi: float
+    n: int     # number of data points
+
+
+def loglog_slope(groups: typing.Iterable[typing.Iterable[tuple[float, float]]]
+                 ) -> Fit | None:
+    """Fit log y = a_g + b log x by least squares and return b.
+
+    The data points (x, y) come in groups that each get their own
+    intercept a_g, so we can pool measurements where other parameters
+    differ and only the scaling with x is shared. Points that aren't
+    positive are ignored. Returns None if there is no variation in x
+    to fit a slope to."""
+    sxx = sxy = syy = 0.0
+    n = ngroups = 0
+    for group in groups:
+        pts = [(math.log(x), math.log(y)) for x, y in group
+               if x > 0 and y > 0 and not math.isnan(y)]
+        if not pts:
+            continue
+        mx = sum(x for x, _ in pts) / len(pts)
+        my = sum(y for _, y in pts) / len(pts)
+        sxx += sum((x - mx) ** 2 for x, _ in pts)
+        sxy += sum((x - mx) * (y - my) for x, y in pts)
+        syy += sum((y - my) ** 2 for _, y in pts)
+        n += len(pts)
+        ngroups += 1
+    if sxx == 0:
+        return None
+    slope = sxy / sxx
+    df = n - ngroups - 1
+    if df <= 0:
+        return Fit(slope, math.nan, math.nan, n)
+    rss = max(0.0, syy - slope * sxy)
+    se = math.sqrt(rss / df / sxx)
+    return Fit(slope, slope - t95(df) * se, slope + t95(df) * se, n)
@@ -0,0 +1,140 @@
+"""Profiling gsa's own commands.
+
+If $GSA_PROFILE is set, gsa.main.main runs the command under the
+profilers selected by $GSA_PROFILE_MODE (cpu, memory or all; default
+cpu) and writes the profiles to files starting with $GSA_PROFILE:
+
+    <prefix>.prof         cProfile statistics (for pstats, snakeviz, ...)
+    <prefix>.folded       sampled call stacks in the collapsed format
+                          flamegraph.pl and speedscope read
+    <prefix>.mem.txt      peak traced memory, and the lines holding the
+                          most memory when the command finished
+    <prefix>.mem.folded   bytes held per call stack when the command
+                          finished, collapsed
+"""
+
+from __future__ import annotations
+
+import typing
+import os
+import os.path
+import signal
+import cProfile
+import tracemalloc
+import collections
+import types
+
+from . import messages
+
+MODES = ["cpu", "memory", "all"]
+
+# Seconds of CPU time between stack samples
+SAMPLE_INTERVAL = 0.001
+
+# Frames to keep in tracemalloc tracebacks
+MEMORY_FRAMES = 64
+
+
+def requested() -> tuple[str, str] | None:
+    """The output prefix and mode from the environment, if profiling."""
+    prefix = os.environ.get('GSA_PROFILE')
+    if not prefix:
+        return None
+    return prefix, os.environ.get('GSA_PROFILE_MODE', 'cpu')
+
+
+def _frame_name(frame: types.FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+class _Sampler:
+    """Count call stacks, sampled on a CPU-time interval timer."""
+
+    stacks: collections.Counter[str]
+
+    def __init__(self) -> None:
+        self.stacks = collections.Counter()
+
+    def _sample(self, _signum: int, frame: types.FrameType | None) -> None:
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(names))] += 1
+
+    def start(self) -> bool:
+        if not hasattr(signal, 'setitimer'):  # pragma: no cover -- Windows
+            return False
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+        return True
+
+    def stop(self) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+
+def _write_folded(fname: str, stacks: typing.Mapping[str, int]) -> None:
+    with open(fname, 'w') as f:
+        for stack, count in sorted(stacks.items()):
+            print(stack, count, file=f)
+
+
+def _write_memory(prefix: str, snapshot: tracemalloc.Snapshot,
+                  peak: int) -> None:
+    stats = snapshot.statistics('traceback')
+    with open(f"{prefix}.mem.txt", 'w') as f:
+        print(f"Peak traced memory: {peak} bytes", file=f)
+        for stat in snapshot.statistics('lineno')[:50]:
+            print(stat, file=f)
+    stacks: collections.Counter[str] = collections.Counter()
+    for stat in stats:
+        frames = [
+            f"{os.path.basename(frame.filename)}:{frame.lineno}"
+            for frame in stat.traceback  # oldest frame first
+        ]
+        stacks[';'.join(frames)] += stat.size
+    _write_folded(f"{prefix}.mem.folded", stacks)
+
+
+def run(command: typing.Callable[[], None], prefix: str, mode: str) -> None:
+    """Run command under the profilers for mode, writing to prefix.*.
+
+    The profiles are written even if the command exits with sys.exit."""
+    if mode not in MODES:
+        messages.warning(f"Unknown GSA_PROFILE_MODE {mode}, expected " +
+                         "one of " + ", ".join(MODES))
+        mode = 'cpu'
+    cpu = mode in ('cpu', 'all')
+    memory = mode in ('memory', 'all')
+    if os.path.dirname(prefix):
+        os.makedirs(os.path.dirname(prefix), exist_ok=True)
+
+    profiler = cProfile.Profile() if cpu else None
+    sampler = _Sampler()
+    sampling = cpu and sampler.start()
+    if memory:
+        tracemalloc.start(MEMORY_FRAMES)
+    if profiler:
+        profiler.enable()
+    try:
+        command()
+    finally:
+        # Stop everything before we write anything, so the profiles
+        # don't include themselves.
+        if profiler:
+            profiler.disable()
+        if sampling:
+            sampler.stop()
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        if profiler:
+            profiler.dump_stats(f"{prefix}.prof")
+        if sampling:
+            _write_folded(f"{prefix}.folded", sampler.stacks)
+        if memory:
+            _write_memory(prefix, snapshot, peak)
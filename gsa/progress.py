@@ -0,0 +1,144 @@
+"""Progress reports for long gsa search and gsa preprocess runs.
+
+With --progress, the commands wrap the reads and chromosomes they
+work through, and we report on stderr, at most once per INTERVAL
+seconds, how far they have come. Reading the clock for every read
+would cost more than some searches, so we only look at it every
+stride reads, adjusting stride so we look about ten times per
+interval. When progress is off, the wrappers return their argument.
+"""
+
+from __future__ import annotations
+
+import typing
+import os
+import sys
+import time
+
+from . import messages
+
+T = typing.TypeVar('T')
+
+# Seconds between reports
+INTERVAL = 1.0
+
+# Largest number of items between clock checks
+MAX_STRIDE = 1 << 16
+
+_enabled = False
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def format_duration(secs: float) -> str:
+    secs = int(secs)
+    if secs >= 3600:
+        return f"{secs // 3600}:{secs // 60 % 60:02}:{secs % 60:02}"
+    return f"{secs // 60}:{secs % 60:02}"
+
+
+class _Reporter:
+    """Writes progress lines, overwriting them on a terminal."""
+
+    def __init__(self) -> None:
+        self.tty = sys.stderr.isatty()
+        self.width = 0
+
+    def show(self, line: str) -> None:
+        if self.tty:
+            messages.message('\r' + line.ljust(self.width), end='')
+            self.width = len(line)
+        else:
+            messages.message(line)
+
+    def done(self, line: str) -> None:
+        self.show(line)
+        if self.tty:
+            messages.message()
+
+
+def _file_size(f: typing.TextIO) -> int | None:
+    try:
+        size = os.fstat(f.fileno()).st_size
+        f.buffer.tell()
+        return size if size > 0 else None
+    except (OSError, AttributeError, ValueError):
+        return None
+
+
+def reads(it: typing.Iterable[T], f: typing.TextIO) -> typing.Iterable[T]:
+    """it, reporting how many items we have seen, how fast, and, if
+    we can tell how far into the file f we are, when we expect to be
+    done."""
+    if not _enabled:
+        return it
+    return _reads(iter(it), f)
+
+
+def _reads(it: typing.Iterator[T], f: typing.TextIO) -> typing.Iterator[T]:
+    reporter = _Reporter()
+    size = _file_size(f)
+    start = last_report = last_check = time.monotonic()
+    n, stride, next_check = 0, 1, 1
+
+    def status(now: float) -> str:
+        elapsed = now - start
+        rate = n / elapsed if elapsed > 0 else 0.0
+        line = f"{n} reads, {rate:.0f} reads/s"
+        if size is not None:
+            done = f.buffer.tell() / size
+            line += f", {min(done, 1.0):.0%}"
+            if 0 < done < 1:
+                line += f", ETA {format_duration(elapsed * (1 - done) / done)}"
+        return line
+
+    for x in it:
+        yield x
+        n += 1
+        if n < next_check:
+            continue
+        now = time.monotonic()
+        if now - last_report >= INTERVAL:
+            reporter.show(status(now))
+            last_report = now
+        # Aim for about ten clock checks per report
+        dt = now - last_check
+        if dt > 0:
+            stride = int(stride * INTERVAL / 10 / dt)
+        stride = max(1, min(stride, MAX_STRIDE))
+        last_check, next_check = now, n + stride
+    reporter.done(status(time.monotonic()))
+
+
+def chromosomes(it: typing.Iterable[T], total: int,
+                what: str = "indexed") -> typing.Iterable[T]:
+    """it, reporting how many of the total chromosomes we have seen."""
+    if not _enabled:
+        return it
+    return _chromosomes(iter(it), total, what)
+
+
+def _chromosomes(it: typing.Iterator[T], total: int,
+                 what: str) -> typing.Iterator[T]:
+    # Chromosomes take long enough that checking the clock for each
+    # one doesn't matter.
+    reporter = _Reporter()
+    start = last_report = time.monotonic()
+    n = 0
+    for x in it:
+        n += 1
+        now = time.monotonic()
+        if now - last_report >= INTERVAL:
+            reporter.show(f"{n}/{total} chromosomes {what}, " +
+                          f"{format_duration(now - start)} elapsed")
+            last_report = now
+        yield x
+    reporter.done(f"{n}/{total} chromosomes {what} in " +
+                  format_duration(time.monotonic() - start))
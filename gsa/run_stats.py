@@ -0,0 +1,141 @@
+"""Workload statistics for gsa search runs.
+
+With --stats FILE, the search commands count the reads they map, how
+many reads have no, one or many hits, and the hits per chromosome,
+and time each read. The latencies go in a histogram with power-of-two
+buckets, so the statistics take constant memory however many reads we
+map, and we keep the slowest reads so we can find the ones that
+dominate the running time. Everything is written to FILE as JSON.
+
+Like timings, the statistics are collected by wrapping the reads
+iterator and the function that writes the hits, so the search loops
+don't change. A read's latency is the time from getting the read to
+asking for the next, i.e., searching for it in every chromosome and
+writing its hits.
+"""
+
+from __future__ import annotations
+
+import typing
+import time
+import json
+import heapq
+import collections
+
+T = typing.TypeVar('T')
+
+FORMAT_VERSION = 1
+
+# Number of slowest reads we report
+SLOWEST = 10
+
+Read = tuple[str, str]  # name, sequence
+
+
+class RunStats:
+    reads: int
+    no_hits: int
+    one_hit: int
+    many_hits: int
+    chromosome_hits: collections.Counter[str]
+    # Bucket i counts latencies of [2^(i-1), 2^i) ns (0 ns in bucket 0)
+    latencies: list[int]
+    slowest: list[tuple[int, str]]  # min-heap of (ns, read name)
+
+    _hits: int  # hits for the current read
+
+    def __init__(self) -> None:
+        self.reads = self.no_hits = self.one_hit = self.many_hits = 0
+        self.chromosome_hits = collections.Counter()
+        self.latencies = []
+        self.slowest = []
+        self._hits = 0
+
+    def counted(self, record: typing.Callable[..., None]
+                ) -> typing.Callable[..., None]:
+        """record, counting the hits it writes. record must take the
+        output, read name and chromosome name first, like
+        sam.ssam_record."""
+        def wrapper(out: typing.TextIO, readname: str, chrname: str,
+                    *args: typing.Any) -> None:
+            self._hits += 1
+            self.chromosome_hits[chrname] += 1
+            record(out, readname, chrname, *args)
+        return wrapper
+
+    def timed_reads(self, reads: typing.Iterable[Read]
+                    ) -> typing.Iterator[Read]:
+        """reads, timing the work done for each."""
+        clock = time.perf_counter_ns
+        for read in reads:
+            start = clock()
+            yield read
+            self.read_done(read[0], clock() - start)
+
+    def read_done(self, readname: str, ns: int | None) -> None:
+        """Count the hits recorded since the last read as readname's.
+
+        If ns is None, we don't know the read's latency."""
+        hits, self._hits = self._hits, 0
+        self.reads += 1
+        if hits == 0:
+            self.no_hits += 1
+        elif hits == 1:
+            self.one_hit += 1
+        else:
+            self.many_hits += 1
+        if ns is None:
+            return
+
+        bucket = ns.bit_length()
+        if bucket >= len(self.latencies):
+            self.latencies.extend([0] * (bucket + 1 - len(self.latencies)))
+        self.latencies[bucket] += 1
+        if len(self.slowest) < SLOWEST:
+            heapq.heappush(self.slowest, (ns, readname))
+        elif ns > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (ns, readname))
+
+    def latency_quantile(self, q: float) -> int | None:
+        """Upper bound on the q-quantile of the latencies in ns,
+        from the histogram; None if we have no latencies."""
+        total = sum(self.latencies)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for bucket, count in enumerate(self.latencies):
+            seen += count
+            if seen >= rank and count:
+                return 1 << bucket
+        return 1 << (len(self.latencies) - 1)  # pragma: no cover
+
+    def to_json(self) -> dict[str, typing.Any]:
+        return {
+            'version': FORMAT_VERSION,
+            'reads': self.reads,
+            'reads_without_hits': self.no_hits,
+            'reads_with_one_hit': self.one_hit,
+            'reads_with_many_hits': self.many_hits,
+            'hits': sum(self.chromosome_hits.values()),
+            'chromosome_hits': dict(self.chromosome_hits),
+            'latency_ns': {
+                'p50': self.latency_quantile(0.5),
+                'p99': self.latency_quantile(0.99),
+                'histogram': [
+                    {'lo': (1 << bucket) >> 1, 'hi': 1 << bucket,
+                     'count': count}
+                    for bucket, count in enumerate(self.latencies)
+                    if count
+                ],
+            },
+            'slowest_reads': [
+                {'read': readname, 'ns': ns}
+                for ns, readname in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+    def write(self, fname: str) -> None:
+        with open(fname, 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
+            f.write("\n")
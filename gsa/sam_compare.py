@@ -0,0 +1,110 @@
+"""Comparing SAM files as multisets of records.
+
+The files can be larger than memory, so we never hold them in memory.
+We first compare an order-independent digest of each file, the sum of
+the hashes of its (normalised) records, which is all we need when the
+files agree. When they don't, we sort both files externally and merge
+them to count the records that are missing from, or extra in, the
+second file. Both count duplicate records, so a tool that reports a
+hit twice doesn't pass.
+"""
+
+from __future__ import annotations
+
+import typing
+import os
+import heapq
+import hashlib
+import tempfile
+
+# Records per sorted run in the external sort
+RUN_SIZE = 100_000
+
+_DIGEST_MOD = 1 << 128
+
+
+class Comparison(typing.NamedTuple):
+    missing: int  # records in the first file that the second lacks
+    extra: int    # records in the second file that the first lacks
+
+    @property
+    def ok(self) -> bool:
+        return self.missing == 0 and self.extra == 0
+
+
+def normalise(line: str) -> str | None:
+    """Normalise a SAM line, or None if it isn't an alignment record.
+
+    Header lines and blank lines are dropped, and the fields are
+    separated by single tabs, whatever whitespace the tool used."""
+    fields = line.split()
+    if not fields or fields[0].startswith('@'):
+        return None
+    return '\t'.join(fields)
+
+
+def records(fname: str) -> typing.Iterator[str]:
+    with open(fname) as f:
+        for line in f:
+            rec = normalise(line)
+            if rec is not None:
+                yield rec
+
+
+def digest(fname: str) -> tuple[int, int]:
+    """Number of records and the sum of their hashes."""
+    n, total = 0, 0
+    for rec in records(fname):
+        h = hashlib.blake2b(rec.encode(), digest_size=16).digest()
+        total = (total + int.from_bytes(h, 'little')) % _DIGEST_MOD
+        n += 1
+    return n, total
+
+
+def _sorted_records(fname: str, workdir: str) -> typing.Iterator[str]:
+    "The records of fname in sorted order, sorting in bounded memory."
+    runs: list[str] = []
+    recs = records(fname)
+    while True:
+        run = sorted(rec for _, rec in zip(range(RUN_SIZE), recs))
+        if not run:
+            break
+        fd, run_name = tempfile.mkstemp(dir=workdir)
+        with os.fdopen(fd, 'w') as f:
+            f.writelines(rec + '\n' for rec in run)
+        runs.append(run_name)
+
+    files = [open(run_name) for run_name in runs]
+    try:
+        # Strip the newlines before merging: the runs are sorted
+        # without them, and "\t" sorts before "\n".
+        yield from heapq.merge(*((line.rstrip('\n') for line in f)
+                                 for f in files))
+    finally:
+        for f in files:
+            f.close()
+
+
+def _diff_sorted(xs: typing.Iterator[str], ys: typing.Iterator[str]
+                 ) -> Comparison:
+    missing = extra = 0
+    x, y = next(xs, None), next(ys, None)
+    while x is not None or y is not None:
+        if y is None or (x is not None and x < y):
+            missing += 1
+            x = next(xs, None)
+        elif x is None or y < x:
+            extra += 1
+            y = next(ys, None)
+        else:
+            x, y = next(xs, None), next(ys, None)
+    return Comparison(missing, extra)
+
+
+def compare(fname1: str, fname2: str) -> Comparison:
+    """Compare the records in two SAM files as multisets."""
+    if digest(fname1) == digest(fname2):
+        return Comparison(0, 0)
+    with tempfile.TemporaryDirectory(prefix='gsa-') as workdir:
+        return _diff_sorted(_sorted_records(fname1, workdir),
+                            _sorted_records(fname2, workdir))
@@ -3,16 +3,24 @@ from __future__ import annotations
 import argparse
 import typing
 import pickle
+import shutil
+import itertools
+import tempfile
+import contextlib
+import concurrent.futures
 import pystr.alphabet
-import pystr.bwt
 import pystr.exact
-import pystr.suffixtree
 import os
 
 from . import fasta
 from . import fastq
 from . import sam
 from . import messages
+from . import cache
+from . import extmem
+from . import timings
+from . import run_stats
+from . import progress
 
 T = typing.TypeVar('T')
 
@@ -46,19 +54,158 @@ PystrReadApproxPreprocessF = typing.Callable[
     PystrApproxPreprocessedF
 ]
 
+ExternalBuildF = typing.Callable[
+    [str, typing.BinaryIO, int],
+    None
+]
+
 GSACommandF = typing.Callable[
     [argparse.Namespace],
     None
 ]
 
+RecordF = typing.Callable[..., None]  # sam.ssam_record or a wrapper of it
+
+if typing.TYPE_CHECKING:
+    import pystr.suffixtree
+
 
 def check_preprocess_input(args: argparse.Namespace) -> None:
     if not os.access(args.genome, os.R_OK):
         messages.error(f"Can't open genome file {args.genome}")
 
 
+# Preprocessed files are a stream of pickles: first PREP_HEADER, then the
+# list of chromosome names, in the order they appear in the genome, and
+# then one (name, tables) pair per chromosome, in whatever order they
+# were computed in. That way we can write each chromosome as soon as it
+# is done instead of holding all the tables in memory. Files from before
+# the header hold a single pickled dict from chromosome names to tables.
+PREP_HEADER = ('gsa-prep', 2)
+
+
+def preprocess_key(genome: str, prep: PystrPreprocessF,
+                   external: bool = False) -> str:
+    return cache.make_key(
+        genome=cache.file_digest(genome),
+        method=prep.__name__,
+        params={'external': external},
+        prep_format=PREP_HEADER,
+    )
+
+
+def write_preprocessed(
+    f: typing.BinaryIO,
+    chrnames: list[str],
+    tables: typing.Iterable[tuple[str, typing.Any]]
+) -> None:
+    pickle.dump(PREP_HEADER, f)
+    pickle.dump(chrnames, f)
+    for chrname, x in tables:
+        pickle.dump((chrname, x), f)
+        f.flush()
+
+
+def read_preprocessed(fname: str) -> dict[str, typing.Any]:
+    if extmem.is_index(fname):
+        return extmem.read_index(fname)
+    with open(fname, 'rb') as f:
+        try:
+            header = pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            header = None
+        if isinstance(header, dict):
+            return typing.cast(dict[str, typing.Any], header)
+        if header != PREP_HEADER:
+            messages.error(f"{fname} is in an old or unknown format; " +
+                           "re-run gsa preprocess")
+        chrnames: list[str] = pickle.load(f)
+        tables: dict[str, typing.Any] = {}
+        while True:
+            try:
+                chrname, x = pickle.load(f)
+            except EOFError:
+                break
+            tables[chrname] = x
+    missing = [chrname for chrname in chrnames if chrname not in tables]
+    if missing:
+        messages.error(f"Preprocessed file {fname} is incomplete; " +
+                       f"missing {', '.join(missing)}")
+    return {chrname: tables[chrname] for chrname in chrnames}
+
+
+def cache_preprocessed(root: str, genome: str, prep: PystrPreprocessF,
+                       write: typing.Callable[[typing.BinaryIO], None],
+                       external: bool = False
+                       ) -> str | None:
+    """Store preprocessed tables in the cache and return their path,
+    or None, with a warning, if we can't write to the cache."""
+    meta = {
+        'kind': 'preprocess',
+        'genome': os.path.abspath(genome),
+        'method': prep.__name__ + (' (external)' if external else ''),
+    }
+    try:
+        return cache.store(root, preprocess_key(genome, prep, external),
+                           write, meta)
+    except OSError as err:
+        messages.warning(f"Can't write to cache {root}: {err}")
+        return None
+
+
+def copy_file(fname: str) -> typing.Callable[[typing.BinaryIO], None]:
+    def write(f: typing.BinaryIO) -> None:
+        with open(fname, 'rb') as src:
+            shutil.copyfileobj(src, f)
+    return write
+
+
+def _prep_chromosome(prep: PystrPreprocessF, chrname: str, seq: str
+                     ) -> tuple[str, typing.Any]:
+    return chrname, prep(seq)
+
+
+def preprocess_chromosomes(
+    prep: PystrPreprocessF,
+    genome: dict[str, str],
+    threads: int = 1
+) -> typing.Iterator[tuple[str, typing.Any]]:
+    """Preprocess all chromosomes, yielding them as they are done.
+
+    With more than one thread, chromosomes are preprocessed on a
+    process pool, largest first, with at most threads chromosomes
+    in flight at any time."""
+    if threads <= 1:
+        for chrname, seq in genome.items():
+            yield chrname, prep(seq)
+        return
+
+    largest_first = iter(sorted(
+        genome, key=lambda chrname: len(genome[chrname]), reverse=True
+    ))
+    with concurrent.futures.ProcessPoolExecutor(threads) as pool:
+        running = set()
+        for chrname in itertools.islice(largest_first, threads):
+            running.add(pool.submit(
+                _prep_chromosome, prep, chrname, genome[chrname]
+            ))
+        while running:
+            done, running = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                yield future.result()
+                # Replace the finished chromosome with the next one
+                for chrname in itertools.islice(largest_first, 1):
+                    running.add(pool.submit(
+                        _prep_chromosome, prep, chrname, genome[chrname]
+                    ))
+
+
 def preprocess_wrapper(name: str, desc: str,
-                       prep: PystrPreprocessF) -> GSACommandF:
+                       prep: PystrPreprocessF,
+                       external: ExternalBuildF | None = None
+                       ) -> GSACommandF:
     def wrap(args: argparse.Namespace) -> None:
         check_preprocess_input(args)
         preproc_name = args.genome + '.' + prep.__name__
@@ -66,13 +213,37 @@ def preprocess_wrapper(name: str, desc: str,
                 not os.access(preproc_name, os.W_OK):
             messages.error(f"Can't open preprocessing file {preproc_name}")
 
-        with open(args.genome, 'r') as f:
+        if args.max_memory is not None:
+            if external is None:
+                messages.error(f"{name} doesn't support --max-memory")
+            with timings.phase('build index'), \
+                    open(preproc_name, 'wb') as preprocfile:
+                external(args.genome, preprocfile, args.max_memory)
+            root = cache.cache_root(args)
+            if root is not None:
+                with timings.phase('cache'):
+                    cache_preprocessed(root, args.genome, prep,
+                                       copy_file(preproc_name),
+                                       external=True)
+            return
+
+        with timings.phase('read genome'), open(args.genome, 'r') as f:
             genome = fasta.read_fasta(f)
-        preprocessed = {
-            chrname: prep(seq) for chrname, seq in genome.items()
-        }
-        with open(preproc_name, 'wb') as preprocfile:
-            pickle.dump(preprocessed, preprocfile)
+        with timings.phase('write index'), \
+                open(preproc_name, 'wb') as preprocfile:
+            write_preprocessed(
+                preprocfile, list(genome),
+                progress.chromosomes(timings.timed_iter(
+                    'preprocess',
+                    preprocess_chromosomes(prep, genome, args.threads)
+                ), len(genome))
+            )
+
+        root = cache.cache_root(args)
+        if root is not None:
+            with timings.phase('cache'):
+                cache_preprocessed(root, args.genome, prep,
+                                   copy_file(preproc_name))
 
     wrap.__name__ = name
     wrap.__doc__ = desc
@@ -86,122 +257,178 @@ def check_map_input(args: argparse.Namespace) -> None:
         messages.error(f"Can't open fastq file {args.reads}")
 
 
-def exact_search_wrapper(search: PystrExactSearchF) -> GSACommandF:
-    def wrap(args: argparse.Namespace) -> None:
-        check_map_input(args)
-        with open(args.genome, 'r') as f:
-            genome = fasta.read_fasta(f)
-        with open(args.reads, 'r') as f:
-            for readname, read in fastq.scan_reads(f):
-                for chrname, seq in genome.items():
-                    for pos in search(seq, read):
-                        sam.ssam_record(
-                            args.out,
-                            readname, chrname,
-                            pos, f'{len(read)}M',
-                            read
-                        )
-    wrap.__name__ = search.__name__
-    wrap.__doc__ = search.__doc__
-    return wrap
+@contextlib.contextmanager
+def search_io(args: argparse.Namespace, per_read: bool = True
+              ) -> typing.Iterator[tuple[typing.Iterator[tuple[str, str]],
+                                         RecordF,
+                                         run_stats.RunStats | None]]:
+    """The reads to search for and the function to write hits with,
+    instrumented for --timings and --stats.
+
+    If per_read is False, the search doesn't finish a read before it
+    gets the next, so it must call stats.read_done itself."""
+    stats = run_stats.RunStats() if args.stats else None
+    record = timings.timed('write SAM', sam.ssam_record)
+    with timings.phase('search'), open(args.reads, 'r') as f:
+        reads = timings.timed_iter('read reads', fastq.scan_reads(f))
+        reads = progress.reads(reads, f)
+        if stats is not None:
+            record = stats.counted(record)
+            if per_read:
+                reads = stats.timed_reads(reads)
+        yield iter(reads), record, stats
+    if stats is not None:
+        stats.write(args.stats)
+
+
+def check_no_max_memory(name: str, max_memory: int | None) -> None:
+    if max_memory is not None:
+        messages.error(f"{name} doesn't support --max-memory")
+
+
+# Number of reads the vectorised search matches at a time
+VECTOR_BATCH = 10_000
+
+# Searches for a list of reads of the same length at once, returning
+# the positions of the hits of each
+BatchSearchF = typing.Callable[[list[str]], list[list[int]]]
+
+
+def search_batch(searchers: dict[str, BatchSearchF],
+                 batch: list[tuple[str, str]]
+                 ) -> list[dict[str, list[int]]]:
+    """The positions of the hits of each read in batch, per chromosome.
+
+    The reads are searched for in groups of the same length."""
+    by_length: dict[int, list[int]] = {}
+    for i, (_, read) in enumerate(batch):
+        by_length.setdefault(len(read), []).append(i)
+
+    hits: list[dict[str, list[int]]] = [{} for _ in batch]
+    for idx in by_length.values():
+        for chrname, search in searchers.items():
+            positions = search([batch[i][1] for i in idx])
+            for i, read_positions in zip(idx, positions):
+                hits[i][chrname] = read_positions
+    return hits
 
 
 def read_or_compute_preprocessed(
     genome: str,
     prep: PystrPreprocessF,
-    search_wrap: typing.Callable[[typing.Any], T]
+    search_wrap: typing.Callable[[typing.Any], T],
+    cache_dir: str | None = None,
+    max_memory: int | None = None,
+    external: ExternalBuildF | None = None
 ) -> dict[str, T]:
+    if external is None:
+        check_no_max_memory(prep.__name__, max_memory)
+
     preproc_name = genome + '.' + prep.__name__
+    if not (os.path.isfile(preproc_name) and
+            os.access(preproc_name, os.R_OK)) and cache_dir is not None:
+        # No preprocessed file, but we might have done it before.
+        # An external-memory index will do if we have one, but with
+        # a memory budget we can't load the in-memory tables.
+        layouts = [True] if max_memory is not None else \
+            [False, True] if external is not None else [False]
+        for ext in layouts:
+            cached = cache.lookup(cache_dir,
+                                  preprocess_key(genome, prep, ext))
+            if cached is not None:
+                preproc_name = cached
+                break
+
     if os.path.isfile(preproc_name) and os.access(preproc_name, os.R_OK):
-        # Unpickle the preprocessed file
-        with open(preproc_name, 'rb') as preproc_file:
-            preproc_table = pickle.load(preproc_file)
+        with timings.phase('load index'):
+            preproc_table = read_preprocessed(preproc_name)
+    elif max_memory is not None:
+        assert external is not None
+        fname = None
+        if cache_dir is not None:
+            with timings.phase('build index'):
+                fname = cache_preprocessed(
+                    cache_dir, genome, prep,
+                    lambda f: external(genome, f, max_memory),
+                    external=True
+                )
+        if fname is not None:
+            with timings.phase('load index'):
+                preproc_table = read_preprocessed(fname)
+        else:
+            with tempfile.NamedTemporaryFile() as tmp:
+                with timings.phase('build index'):
+                    external(genome, typing.cast(typing.BinaryIO, tmp),
+                             max_memory)
+                    tmp.flush()
+                with timings.phase('load index'):
+                    preproc_table = read_preprocessed(tmp.name)
     else:  # we need to do the preprocessing now
-        with open(genome, 'r') as f:
+        with timings.phase('read genome'), open(genome, 'r') as f:
             chromosomes = fasta.read_fasta(f)
-        preproc_table = {
-            chrname: prep(seq) for chrname, seq in chromosomes.items()
+        with timings.phase('preprocess'):
+            preproc_table = dict(progress.chromosomes(
+                preprocess_chromosomes(prep, chromosomes), len(chromosomes)
+            ))
+        if cache_dir is not None:
+            # Keep the tables so we don't have to do this again
+            with timings.phase('cache'):
+                cache_preprocessed(
+                    cache_dir, genome, prep,
+                    lambda f: write_preprocessed(
+                        f, list(preproc_table), preproc_table.items()
+                    )
+                )
+    with timings.phase('load index'):
+        return {
+            chrname: search_wrap(x) for chrname, x in preproc_table.items()
         }
-    return {
-        chrname: search_wrap(x) for chrname, x in preproc_table.items()
-    }
-
-
-def exact_search_preprocess_wrapper(
-    name: str, doc: str,
-    prep: PystrPreprocessF,
-    search_wrap: PystrReadExactPreprocessF
-) -> GSACommandF:
-    def wrap(args: argparse.Namespace) -> None:
-        check_map_input(args)
 
-        searchers = read_or_compute_preprocessed(
-            args.genome, prep, search_wrap
-        )
-        with open(args.reads, 'r') as f:
-            for readname, read in fastq.scan_reads(f):
-                for chrname, search in searchers.items():
-                    for pos in search(read):
-                        sam.ssam_record(
-                            args.out,
-                            readname, chrname,
-                            pos, f'{len(read)}M',
-                            read
-                        )
-    wrap.__name__ = name
-    wrap.__doc__ = doc
-    return wrap
-
-
-def approx_search_preprocess_wrapper(
-    name: str, doc: str,
-    prep: PystrPreprocessF,
-    search_wrap: PystrReadApproxPreprocessF
-) -> GSACommandF:
-    def wrap(args: argparse.Namespace) -> None:
-        check_map_input(args)
-
-        searchers = read_or_compute_preprocessed(
-            args.genome, prep, search_wrap
-        )
-        with open(args.reads, 'r') as f:
-            for readname, read in fastq.scan_reads(f):
-                for chrname, search in searchers.items():
-                    for pos, cigar in search(read, args.edits):
-                        sam.ssam_record(
-                            args.out,
-                            readname, chrname,
-                            pos, cigar,
-                            read
-                        )
-    wrap.__name__ = name
-    wrap.__doc__ = doc
-    return wrap
 
+# The BWT and suffix tree modules are only imported by the engines that
+# use them, so the other searches don't pay for loading them.
 
 def exact_bwt(x: str) -> typing.Any:
     """Preprocessing for the exact BWT search."""
+    import pystr.bwt
     return pystr.bwt.preprocess_exact(x)
 
 
 def exact_bwt_search_wrapper(tables: typing.Any) -> PystrExactPreprocessedF:
+    if isinstance(tables, extmem.Index):
+        return tables.search
+    import pystr.bwt
     return pystr.bwt.exact_searcher_from_tables(*tables)
 
 
 def approx_bwt(x: str) -> typing.Any:
     """Preprocessing for the approximative BWT search."""
+    import pystr.bwt
     return pystr.bwt.preprocess_approx(x)
 
 
 def approx_bwt_search_wrapper(tables: typing.Any) -> PystrApproxPreprocessedF:
+    import pystr.bwt
     return pystr.bwt.approx_searcher_from_tables(*tables)
 
 
+def st_naive(x: str) -> typing.Any:
+    """Naive O(n²) suffix tree construction."""
+    import pystr.suffixtree
+    return pystr.suffixtree.naive_st_construction(x)
+
+
+def st_mccreight(x: str) -> typing.Any:
+    """McCreight suffix tree construction."""
+    import pystr.suffixtree
+    return pystr.suffixtree.mccreight_st_construction(x)
+
+
 preprocess: list[GSACommandF] = [
     preprocess_wrapper(
         "exact-bwt",
         "BWT for exact matching",
-        exact_bwt),
+        exact_bwt, external=extmem.build_index),
     preprocess_wrapper(
         "approx-bwt",
         "BWT for approximative matching",
@@ -211,11 +438,11 @@ preprocess: list[GSACommandF] = [
     # preprocess_wrapper(
     #    "st-naive",
     #    "Naive O(n²) suffix tree construction",
-    #    pystr.suffixtree.naive_st_construction),
+    #    st_naive),
     # preprocess_wrapper(
     #    "st-mccreight",
     #    "McCreight suffix tree construction",
-    #    pystr.suffixtree.mccreight_st_construction),
+    #    st_mccreight),
 ]
 
 
@@ -224,30 +451,155 @@ def wrap_st(st: pystr.suffixtree.SuffixTree
     return st.search
 
 
+# SECTION Engines
+# The algorithms behind the search commands. We build the commands
+# from them, and bench.py drives them in-process, without the file
+# handling.
+
+class Engine(typing.NamedTuple):
+    name: str
+    doc: str | None
+    # Preprocessing of a chromosome; None for online algorithms,
+    # whose searcher gets the chromosome itself.
+    prep: PystrPreprocessF | None
+    # From the (preprocessed) chromosome to a search function
+    searcher: typing.Callable[[typing.Any], typing.Callable[..., typing.Any]]
+    # Whether the preprocessed tables can be pickled to a file
+    storable: bool = True
+    # Builds the index in external memory, for --max-memory
+    external: ExternalBuildF | None = None
+    # Whether the search function is a BatchSearchF, searching for
+    # many reads at once, instead of searching for one read
+    batched: bool = False
+
+
+def online(search: PystrExactSearchF
+           ) -> typing.Callable[[str], PystrExactPreprocessedF]:
+    def searcher(x: str) -> PystrExactPreprocessedF:
+        return lambda p: search(x, p)
+    return searcher
+
+
+def vector_matcher(x: str) -> typing.Any:
+    from . import vector
+    return vector.Matcher(x)
+
+
+def vector_searcher(matcher: typing.Any) -> BatchSearchF:
+    return typing.cast(BatchSearchF, matcher.search)
+
+
+def online_engine(search: PystrExactSearchF) -> Engine:
+    return Engine(search.__name__, search.__doc__, None, online(search))
+
+
+exact_engines: list[Engine] = [
+    online_engine(pystr.exact.naive),
+    online_engine(pystr.exact.kmp),
+    online_engine(pystr.exact.border),
+    online_engine(pystr.exact.bmh),
+    Engine('vector', "Vectorised (NumPy) matching of batches of reads.",
+           vector_matcher, vector_searcher, storable=False, batched=True),
+    Engine('bwt', 'Burrows-Wheeler FM-index search',
+           exact_bwt, exact_bwt_search_wrapper,
+           external=extmem.build_index),
+    Engine('st-naive', "Suffix tree search (built with naive algorithm)",
+           st_naive, wrap_st, storable=False),
+    Engine('st-mccreight',
+           "Suffix tree search (built with McCreight's algorithm)",
+           st_mccreight, wrap_st, storable=False),
+]
+
+approx_engines: list[Engine] = [
+    Engine('bwt', 'Burrows-Wheeler FM-index search',
+           approx_bwt, approx_bwt_search_wrapper),
+]
+
+# !SECTION
+
+
+def engine_searchers(engine: Engine, args: argparse.Namespace
+                     ) -> dict[str, typing.Any]:
+    """The engine's search function for each chromosome of args.genome."""
+    if engine.external is None:
+        check_no_max_memory(engine.name, args.max_memory)
+    if engine.prep is not None:
+        return read_or_compute_preprocessed(
+            args.genome, engine.prep, engine.searcher,
+            cache.cache_root(args) if engine.storable else None,
+            args.max_memory, engine.external
+        )
+    with timings.phase('read genome'), open(args.genome, 'r') as f:
+        genome = fasta.read_fasta(f)
+    return {chrname: engine.searcher(seq) for chrname, seq in genome.items()}
+
+
+def batch_search(args: argparse.Namespace,
+                 searchers: dict[str, BatchSearchF]) -> None:
+    """Search for the reads VECTOR_BATCH at a time."""
+    with search_io(args, per_read=False) as (reads, record, stats):
+        while batch := list(itertools.islice(reads, VECTOR_BATCH)):
+            hits = search_batch(searchers, batch)
+            for (readname, read), read_hits in zip(batch, hits):
+                for chrname in searchers:
+                    for pos in read_hits[chrname]:
+                        record(
+                            args.out,
+                            readname, chrname,
+                            pos, f'{len(read)}M',
+                            read
+                        )
+                if stats is not None:
+                    # We search a batch at a time, so per-read
+                    # latencies aren't meaningful.
+                    stats.read_done(readname, None)
+
+
+def exact_search_command(engine: Engine) -> GSACommandF:
+    def wrap(args: argparse.Namespace) -> None:
+        check_map_input(args)
+        searchers = engine_searchers(engine, args)
+        if engine.batched:
+            batch_search(args, searchers)
+            return
+        with search_io(args) as (reads, record, _):
+            for readname, read in reads:
+                for chrname, search in searchers.items():
+                    for pos in search(read):
+                        record(
+                            args.out,
+                            readname, chrname,
+                            pos, f'{len(read)}M',
+                            read
+                        )
+    wrap.__name__ = engine.name
+    wrap.__doc__ = engine.doc
+    return wrap
+
+
+def approx_search_command(engine: Engine) -> GSACommandF:
+    def wrap(args: argparse.Namespace) -> None:
+        check_map_input(args)
+        searchers = engine_searchers(engine, args)
+        with search_io(args) as (reads, record, _):
+            for readname, read in reads:
+                for chrname, search in searchers.items():
+                    for pos, cigar in search(read, args.edits):
+                        record(
+                            args.out,
+                            readname, chrname,
+                            pos, cigar,
+                            read
+                        )
+    wrap.__name__ = engine.name
+    wrap.__doc__ = engine.doc
+    return wrap
+
+
 exact_search: list[GSACommandF] = [
-    exact_search_wrapper(pystr.exact.naive),
-    exact_search_wrapper(pystr.exact.kmp),
-    exact_search_wrapper(pystr.exact.border),
-    exact_search_wrapper(pystr.exact.bmh),
-    exact_search_preprocess_wrapper(
-        'bwt',
-        'Burrows-Wheeler FM-index search',
-        exact_bwt, exact_bwt_search_wrapper),
-    exact_search_preprocess_wrapper(
-        'st-naive',
-        "Suffix tree search (built with naive algorithm)",
-        pystr.suffixtree.naive_st_construction,
-        wrap_st),
-    exact_search_preprocess_wrapper(
-        'st-mccreight',
-        "Suffix tree search (built with McCreight's algorithm)",
-        pystr.suffixtree.mccreight_st_construction,
-        wrap_st),
+    exact_search_command(engine) for engine in exact_engines
 ]
 
 approx_search: list[GSACommandF] = [
-    approx_search_preprocess_wrapper(
-        'bwt',
-        'Burrows-Wheeler FM-index search',
-        approx_bwt, approx_bwt_search_wrapper)
+    approx_search_command(engine) for engine in approx_engines
 ]
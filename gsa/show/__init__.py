@@ -10,3 +10,7 @@ def show(args: argparse.Namespace) -> None:
 
     Select command."""
     show.parser.print_usage()
+
+
+for name in ['exact', 'skew', 'lcp', 'bwt', 'suffixtree', 'trie']:
+    show.subparsers.add_lazy(name, f"{__name__}.{name}")
@@ -1,6 +1,6 @@
 import argparse
 
-from typing import Callable, Any
+from typing import Callable, Any, Iterable, Iterator, Optional
 
 from pystr.alphabet import Alphabet
 import pystr.bwt
@@ -14,7 +14,7 @@ from ..vis.cols import \
     bright_blue, bright_green,  bright_red, \
     black, green, magenta, red, blue, yellow
 
-from ..args import command, argument
+from ..args import command, argument, non_negative_int
 from . import show
 
 
@@ -32,18 +32,91 @@ def hit_enter() -> None:
     input("Press ENTER to continue")
 
 
-def rotation_table(x: str, sa: list[int]) -> Table:
-    tbl = Table(
-        ColSpec("pointer", align=Align.RIGHT),
-        ColSpec("prefix", right_pad=""),
-        ColSpec("rotation"),
-        ColSpec("r_pointer")
-    )
-    for j in sa:
-        row = tbl.add_row()
-        row["rotation"] = str(x[j:])+str(x[:j])
-    tbl.add_row()  # so we can index beyond the last
-    return tbl
+# The rows of a rotation table to show, as sorted, disjoint ranges.
+# None means all of them.
+View = Optional[list[range]]
+
+
+def window(points: Iterable[int], context: Optional[int]) -> View:
+    """The rows within context rows of any of the points, or all rows
+    if context is None."""
+    if context is None:
+        return None
+    view: list[range] = []
+    for p in sorted(points):
+        start, stop = max(0, p - context), p + context + 1
+        if view and start <= view[-1].stop:
+            view[-1] = range(view[-1].start, max(stop, view[-1].stop))
+        else:
+            view.append(range(start, stop))
+    return view
+
+
+class RotationTable(Table):
+    """The rotations of x in suffix array order, plus an empty row one
+    past the last so we can point there.
+
+    Only the rows in the view are built and shown; the rows between
+    them are replaced by a line saying how many we skipped. We still
+    index rows by their rank among all the rotations. Rows outside the
+    view are built when asked for, but changes to them are lost, so
+    loops over a range of rows should go through visible()."""
+
+    x: str
+    sa: list[int]
+    view: list[range]
+    _shown: dict[int, Row]
+
+    def __init__(self, x: str, sa: list[int], view: View = None) -> None:
+        super().__init__(
+            ColSpec("pointer", align=Align.RIGHT),
+            ColSpec("prefix", right_pad=""),
+            ColSpec("rotation"),
+            ColSpec("r_pointer")
+        )
+        self.x, self.sa = x, sa
+        n = len(sa) + 1
+        if view is None:
+            view = [range(n)]
+        self.view = [
+            range(r.start, min(r.stop, n)) for r in view if r.start < n
+        ]
+        self._shown = {}
+        shown = 0
+        for r in self.view:
+            self._skip(r.start - shown)
+            for i in r:
+                self._shown[i] = self._fill(self.add_row(), i)
+            shown = r.stop
+        self._skip(n - shown)
+
+    def _fill(self, row: Row, i: int) -> Row:
+        if i < len(self.sa):
+            j = self.sa[i]
+            row["rotation"] = str(self.x[j:])+str(self.x[:j])
+        return row
+
+    def _skip(self, rows: int) -> None:
+        if rows > 0:
+            self.add_row()["rotation"] = \
+                f"... {rows} row{'s' if rows > 1 else ''} ..."
+
+    def __getitem__(self, i: int) -> Row:
+        if i < 0:
+            i += len(self.sa) + 1
+        row = self._shown.get(i)
+        if row is None:
+            row = self._fill(Row(self, [""] * 4, [0] * 4), i)
+        return row
+
+    def visible(self, start: int, stop: int) -> Iterator[int]:
+        """The rows in [start,stop) that we show."""
+        for r in self.view:
+            yield from range(max(start, r.start), min(stop, r.stop))
+
+
+def rotation_table(x: str, sa: list[int], view: View = None) -> RotationTable:
+    return RotationTable(x, sa, view)
 
 
 def rot_row(row: Row, a: str, col: Colour) -> None:
@@ -67,20 +140,20 @@ def shift_row(row: Row,
 
 # FIXME: Figure out how to specify that f should take a row
 # as its first argument and then *args...
-def map_rows(tbl: Table, start: int, stop: int,
+def map_rows(tbl: RotationTable, start: int, stop: int,
              f: Callable[..., Any], *args: Any
              ) -> None:
-    for i in range(start, stop):
+    for i in tbl.visible(start, stop):
         f(tbl[i], *args)
 
 
-def rot_rows(tbl: Table, a: str,
+def rot_rows(tbl: RotationTable, a: str,
              start: int, stop: int,
              col: Colour = plain) -> None:
     map_rows(tbl, start, stop, rot_row, a, col)
 
 
-def shift_rows(tbl: Table, start: int, stop: int,
+def shift_rows(tbl: RotationTable, start: int, stop: int,
                amount: int = 1,
                prefix_col: Colour = green,
                rot_col: Colour = underline) -> None:
@@ -92,6 +165,10 @@ def shift_rows(tbl: Table, start: int, stop: int,
              help='string the BWT rotations are made over.'),
     argument('k', metavar='k', type=int, help='current index.'),
     argument('a', metavar='a', type=str, help='character to prepend.'),
+    argument('-w', '--window', metavar='ROWS', type=non_negative_int,
+             default=None,
+             help="Only show the rotations within this many rows of "
+                  "the rows we point to (default all)."),
     argument('--interactive',
              action=argparse.BooleanOptionalAction,
              default=True,
@@ -121,11 +198,13 @@ def trans(args: argparse.Namespace) -> None:
     b, sa = pystr.bwt.burrows_wheeler_transform_bytes(x, alpha)
     ctab = pystr.bwt.CTable(b, len(alpha))
     otab = pystr.bwt.OTable(b, len(alpha))
+    hit_idx = ctab[abyte] + otab[abyte, args.k]
+    view = window([args.k, ctab[abyte], hit_idx], args.window)
 
     print()
     print(bright_blue(f"{underline}String we want to jump from:"))
     print()
-    tbl = rotation_table(alpha.revmap(x), sa)
+    tbl = rotation_table(alpha.revmap(x), sa, view)
     tbl[args.k]["pointer"] = bold("k ->")
     tbl[args.k]["rotation"] = underline(tbl[args.k]["rotation"])
     print(tbl)
@@ -137,7 +216,7 @@ def trans(args: argparse.Namespace) -> None:
     print(bright_blue(
         f"{underline}Attempted rotation:"))
     print()
-    tbl = rotation_table(alpha.revmap(x), sa)
+    tbl = rotation_table(alpha.revmap(x), sa, view)
     tbl[args.k]["pointer"] = bold("k ->")
     tbl[args.k]["prefix"] = bright_green(args.a)
     tbl[args.k]["rotation"] = colour(tbl[args.k]["rotation"])[
@@ -150,14 +229,14 @@ def trans(args: argparse.Namespace) -> None:
 
     print(bright_blue(f"{underline}Find the bucket:"))
     print()
-    tbl = rotation_table(alpha.revmap(x), sa)
+    tbl = rotation_table(alpha.revmap(x), sa, view)
     tbl[args.k]["pointer"] = bold("k ->")
     tbl[args.k]["prefix"] = bright_green(args.a)
     tbl[args.k]["rotation"] = colour(tbl[args.k]["rotation"])[
         0:-1, underline][-1, black]
 
     tbl[ctab[abyte]]["pointer"] = green(f"C[{args.a}] ->")
-    for i in range(ctab[abyte], len(sa)):
+    for i in tbl.visible(ctab[abyte], len(sa)):
         row = tbl[i]
         if not row["rotation"].startswith(args.a):
             break
@@ -170,7 +249,7 @@ def trans(args: argparse.Namespace) -> None:
 
     print(bright_blue(f"{underline}Count offset:"))
     print()
-    tbl = rotation_table(alpha.revmap(x), sa)
+    tbl = rotation_table(alpha.revmap(x), sa, view)
     rot_rows(tbl, args.a, 0, args.k)
 
     tbl[args.k]["pointer"] = bold("k ->")
@@ -186,12 +265,11 @@ def trans(args: argparse.Namespace) -> None:
 
     print(bright_blue(f"{underline}Done:"))
     print()
-    res_tbl = rotation_table(alpha.revmap(x), sa)
-    shift_rows(res_tbl, ctab[abyte], ctab[abyte] + otab[abyte, args.k])
+    res_tbl = rotation_table(alpha.revmap(x), sa, view)
+    shift_rows(res_tbl, ctab[abyte], hit_idx)
 
     res_tbl[ctab[abyte]]["pointer"] = green(f"C[{args.a}] ->")
 
-    hit_idx = ctab[abyte] + otab[abyte, args.k]
     if hit_idx < len(x):
         row = res_tbl[hit_idx]
         row["pointer"] = green(f"C[{args.a}]") + " + " + \
@@ -221,6 +299,10 @@ def trans(args: argparse.Namespace) -> None:
              help='string the BWT rotations are made over.'),
     argument('p', metavar='p', type=str,
              help='pattern we search for.'),
+    argument('-w', '--window', metavar='ROWS', type=non_negative_int,
+             default=None,
+             help="Only show the rotations within this many rows of "
+                  "the rows we point to (default all)."),
     argument('--interactive',
              action=argparse.BooleanOptionalAction,
              default=True,
@@ -264,25 +346,28 @@ def search(args: argparse.Namespace) -> None:
         print("Prepending:", green(alpha.revmap(y)))
         print()
 
-        start_tbl = rotation_table(alpha.revmap(x), sa)
+        new_L = ctab[y] + otab[y, L]
+        new_R = ctab[y] + otab[y, R]
+        view = window([L, R, new_L, new_R], args.window)
+
+        start_tbl = rotation_table(alpha.revmap(x), sa, view)
         start_tbl[L]["pointer"] = bold("L ->")
         start_tbl[R]["pointer"] = bold("R ->")
-        for i in range(L, R):
+        for i in start_tbl.visible(L, R):
             row = start_tbl[i]
             row["rotation"] = colour(row["rotation"])[:j, underline & bold]
 
-        L_tbl = rotation_table(alpha.revmap(x), sa)
+        L_tbl = rotation_table(alpha.revmap(x), sa, view)
         L_tbl[L]["pointer"] = bold("L ->")
         rot_rows(L_tbl, alpha.revmap(y), 0, L, blue)
 
-        R_tbl = rotation_table(alpha.revmap(x), sa)
+        R_tbl = rotation_table(alpha.revmap(x), sa, view)
         R_tbl[R]["pointer"] = bold("R ->")
         rot_rows(R_tbl, alpha.revmap(y), 0, R, yellow)
 
-        L = ctab[y] + otab[y, L]
-        R = ctab[y] + otab[y, R]
+        L, R = new_L, new_R
 
-        res_tbl = rotation_table(alpha.revmap(x), sa)
+        res_tbl = rotation_table(alpha.revmap(x), sa, view)
         if L < R:
             res_tbl[L]["pointer"] = bold("L ->")
             res_tbl[R]["pointer"] = bold("R ->")
@@ -304,13 +389,13 @@ def search(args: argparse.Namespace) -> None:
             L, R = 0, 0
             break
 
-    tbl = rotation_table(alpha.revmap(x), sa)
+    tbl = rotation_table(alpha.revmap(x), sa, window([L, R], args.window))
     if L < R:
         print(bright_green("Found matches:"))
         print()
         tbl[L]["pointer"] = bold("L ->")
         tbl[R]["pointer"] = bold("R ->")
-        for i in range(L, R):
+        for i in tbl.visible(L, R):
             row = tbl[i]
             row["rotation"] = \
                 colour(row["rotation"])[:len(p),
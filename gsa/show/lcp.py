@@ -8,6 +8,7 @@ from ..vis import colour, place_pointers, Table, ColSpec, Align
 
 from ..args import command, argument
 from . import show
+from .trace import Trace
 
 
 def hit_enter(interactive: bool) -> None:
@@ -144,6 +145,35 @@ def lcp_from_sa(x: str, sa: list[int],
     return lcp
 
 
+def lcp_trace(x: str, sa: list[int], trace: Trace) -> list[int]:
+    """lcp_from_sa without the visualisation, tracing each lcp
+    value as we find it.
+
+    The event for row ii of the lcp array has the suffix i we compare
+    against the one before it in sa, j, and the offset we start
+    comparing from; lcp - offset characters matched."""
+    trace('start', x=x, sa=sa)
+    lcp = [-1] * len(sa)
+    isa = inverse_sa(sa)
+
+    offset = 0
+    for i in range(len(sa)):
+        offset = max(0, offset - 1)
+        ii = isa[i]
+        if ii == 0:
+            lcp[ii] = 0
+            trace('lcp', i=i, ii=ii, j=None, offset=offset, lcp=0)
+            continue
+        j = sa[ii - 1]
+        start = offset
+        offset += compare_lcp(x, i+offset, j+offset)
+        lcp[ii] = offset
+        trace('lcp', i=i, ii=ii, j=j, offset=start, lcp=offset)
+
+    trace('done', lcp=lcp)
+    return lcp
+
+
 @command(
     argument('x', metavar='x', type=str,
              help='string to build the sa/lcp from.'),
@@ -151,10 +181,18 @@ def lcp_from_sa(x: str, sa: list[int],
              action=argparse.BooleanOptionalAction,
              default=True,
              help="The visualisation should pause between steps."),
+    argument('--trace', metavar='FILE',
+             type=argparse.FileType('w'), default=None,
+             help="Don't show the algorithm, but write its steps to "
+                  "FILE as JSON events."),
 
     parent=show.subparsers
 )
 def lcp(args: argparse.Namespace) -> None:
     """Display run of algorithm for constructing the lcp from the sa."""
     sa = sais.sais(args.x)
-    lcp_from_sa(args.x, sa, args.interactive)
+    if args.trace:
+        with args.trace:
+            lcp_trace(args.x, sa, Trace(args.trace))
+    else:
+        lcp_from_sa(args.x, sa, args.interactive)
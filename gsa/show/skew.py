@@ -14,6 +14,7 @@ from ..vis.cols import Colour, \
 
 from ..args import command, argument
 from . import show
+from .trace import Trace
 
 INTERACTIVE = True
 TERMINAL_SENTINEL = 0
@@ -450,6 +451,73 @@ def skew_rec(x: list[int], alpha: Alpha) -> list[int]:
     return SA
 
 
+# !SECTION
+
+# SECTION Tracing the Skew algorithm
+# The same algorithm as skew_rec, but recording its steps as events
+# instead of showing them.
+
+def less(ii: int, jj: int, x: list[int], ISA: dict[int, int]) -> bool:
+    "show_less without the visualisation."
+    while True:
+        a: int = safe_idx(x, ii)
+        b: int = safe_idx(x, jj)
+        if a != b:
+            return a < b
+        if ii % 3 != 0 and jj % 3 != 0:
+            return ISA[ii] < ISA[jj]
+        ii, jj = ii + 1, jj + 1
+
+
+def skew_trace(x: list[int], asize: int, trace: Trace,
+               depth: int = 0) -> list[int]:
+    """Recursive skew SA construction, tracing the steps.
+
+    All events have the recursion depth. We record the string we sort,
+    SA12 after each radix sort pass and after the recursion, the
+    string we recurse on, SA3 before and after sorting it, and which
+    list each step of the merge takes its index from."""
+    trace('skew', depth=depth, x=x)
+
+    SA12 = [i for i in range(len(x)) if i % 3 != 0]
+    for offset in [2, 1, 0]:
+        SA12 = bucket_sort(x, asize, SA12, offset)
+        trace('radix', depth=depth, offset=offset, sa12=SA12)
+
+    skew_new_alpha = collect_alphabet(x, SA12)
+    if len(skew_new_alpha) - 2 < len(SA12):  # -2 for $ and #
+        u = build_u(x, skew_new_alpha)
+        trace('recurse', depth=depth, u=u)
+        sa_u = skew_trace(u, len(skew_new_alpha), trace, depth + 1)
+        m = len(sa_u) // 2
+        SA12 = [u_idx(i, m) for i in sa_u if i != m]
+        trace('sa12', depth=depth, sa12=SA12)
+
+    SA3 = ([len(x) - 1] if len(x) % 3 == 1 else []) + \
+        [i - 1 for i in SA12 if i % 3 == 1]
+    trace('sa3', depth=depth, sa3=SA3)
+    SA3 = bucket_sort(x, asize, SA3)
+    trace('sa3_sorted', depth=depth, sa3=SA3)
+
+    ISA = {SA12[i]: i for i in range(len(SA12))}
+    i, j = 0, 0
+    SA: list[int] = []
+    while i < len(SA12) and j < len(SA3):
+        if less(SA12[i], SA3[j], x, ISA):
+            SA.append(SA12[i])
+            trace('merge', depth=depth, i=i, j=j, take='sa12', sa=SA12[i])
+            i += 1
+        else:
+            SA.append(SA3[j])
+            trace('merge', depth=depth, i=i, j=j, take='sa3', sa=SA3[j])
+            j += 1
+    SA.extend(SA12[i:])
+    SA.extend(SA3[j:])
+
+    trace('done', depth=depth, sa=SA)
+    return SA
+
+
 # !SECTION
 
 # SECTION Main application
@@ -468,6 +536,11 @@ def skew_rec(x: list[int], alpha: Alpha) -> list[int]:
              default=True,
              help="The visualisation should pause between steps."),
 
+    argument('--trace', metavar='FILE',
+             type=argparse.FileType('w'), default=None,
+             help="Don't show the algorithm, but write its steps to "
+                  "FILE as JSON events."),
+
     argument('x', metavar='string', type=str,
              help='string to build the suffix array from.'),
     parent=show.subparsers
@@ -483,6 +556,14 @@ def skew(args: argparse.Namespace) -> None:
 
     x, alpha = remap_str(args.x)
 
+    if args.trace:
+        with args.trace:
+            trace = Trace(args.trace)
+            trace('start', string=args.x, x=x,
+                  alphabet={str(a): c for a, c in alpha.items()})
+            skew_trace(x, len(alpha) + 2, trace)  # +2 for sentinels
+        return
+
     print(colour("Mapping the string to integers")[:, bright_cyan & underline])
     print(map_str(x, alpha), '=>', x)
     print()
@@ -0,0 +1,32 @@
+"""Event logs for the show commands' --trace option.
+
+Rendering every step of an algorithm as tables is what makes the show
+commands slow on anything but short strings. With --trace FILE, they
+instead run a version of the algorithm that records each change to
+its state as an event, and write the events to FILE as JSON, one
+object per line:
+
+    {"event": "lcp", "i": 3, "ii": 5, "j": 7, "offset": 1, "lcp": 4}
+
+Each event has an "event" field naming what happened; the other
+fields depend on the algorithm. Events carry only what changed, so a
+trace is about as long as the algorithm's running time.
+"""
+
+import json
+import typing
+
+
+class Trace:
+    f: typing.TextIO
+    events: int
+
+    def __init__(self, f: typing.TextIO) -> None:
+        self.f = f
+        self.events = 0
+
+    def __call__(self, event: str, **fields: typing.Any) -> None:
+        self.f.write(json.dumps({'event': event, **fields},
+                                separators=(',', ':')))
+        self.f.write('\n')
+        self.events += 1
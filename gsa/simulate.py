@@ -4,6 +4,10 @@ import sys
 
 from . import fasta, fastq
 
+# Bump this whenever a change makes the simulations produce different
+# data from the same seed, so cached datasets are regenerated.
+VERSION = 1
+
 
 def simulate_dna_string(n: int) -> str:
     return ''.join(random.choice("acgt") for _ in range(n))
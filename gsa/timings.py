@@ -0,0 +1,179 @@
+"""Wall and CPU time per phase of a gsa command.
+
+With --timings or --timings-json, gsa.main.main enables timing and
+the commands mark out their phases, either as blocks
+
+    with timings.phase('read genome'):
+        genome = fasta.read_fasta(f)
+
+or, for work interleaved in a loop, by wrapping the functions or
+iterators that do it:
+
+    reads = timings.timed_iter('read reads', fastq.scan_reads(f))
+    record = timings.timed('write SAM', sam.ssam_record)
+
+Phases nest, and a phase's time doesn't include the phases inside it,
+so the phases add up to the total. When timing is off, phase is an
+empty block and timed and timed_iter return their argument, so the
+commands run as they would without them.
+
+CPU time is that of the gsa process itself, not of worker processes.
+"""
+
+from __future__ import annotations
+
+import typing
+import time
+import json
+import contextlib
+import functools
+
+from .vis import Table, L, R
+
+T = typing.TypeVar('T')
+F = typing.TypeVar('F', bound=typing.Callable[..., typing.Any])
+
+FORMAT_VERSION = 1
+
+
+class Totals:
+    """Accumulated time spent in a phase."""
+
+    __slots__ = ('wall', 'cpu', 'calls')
+
+    wall: float
+    cpu: float
+    calls: int
+
+    def __init__(self) -> None:
+        self.wall = self.cpu = 0.0
+        self.calls = 0
+
+
+_enabled = False
+_start = (0.0, 0.0)
+_totals: dict[str, Totals] = {}
+# For each running phase, the wall and CPU time of the phases inside it
+_stack: list[list[float]] = []
+
+# (children, wall at start, CPU at start)
+_Token = tuple[list[float], float, float]
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    """Start timing, discarding any earlier timings."""
+    global _enabled, _start
+    _enabled = True
+    _totals.clear()
+    _stack[:] = [[0.0, 0.0]]
+    _start = (time.perf_counter(), time.process_time())
+
+
+def _begin() -> _Token:
+    children = [0.0, 0.0]
+    _stack.append(children)
+    return children, time.perf_counter(), time.process_time()
+
+
+def _end(name: str, token: _Token, calls: int = 1) -> None:
+    wall = time.perf_counter() - token[1]
+    cpu = time.process_time() - token[2]
+    children = _stack.pop()
+    totals = _totals.get(name)
+    if totals is None:
+        totals = _totals[name] = Totals()
+    totals.wall += wall - children[0]
+    totals.cpu += cpu - children[1]
+    totals.calls += calls
+    parent = _stack[-1]
+    parent[0] += wall
+    parent[1] += cpu
+
+
+@contextlib.contextmanager
+def phase(name: str) -> typing.Iterator[None]:
+    if not _enabled:
+        yield
+        return
+    token = _begin()
+    try:
+        yield
+    finally:
+        _end(name, token)
+
+
+def timed(name: str, f: F) -> F:
+    """f, adding the time spent in its calls to phase name."""
+    if not _enabled:
+        return f
+
+    @functools.wraps(f)
+    def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        token = _begin()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _end(name, token)
+    return typing.cast(F, wrapper)
+
+
+def timed_iter(name: str, it: typing.Iterable[T]) -> typing.Iterable[T]:
+    """it, adding the time spent producing its items to phase name."""
+    if not _enabled:
+        return it
+    return _timed_iter(name, iter(it))
+
+
+def _timed_iter(name: str, it: typing.Iterator[T]) -> typing.Iterator[T]:
+    while True:
+        token = _begin()
+        try:
+            x = next(it)
+        except StopIteration:
+            _end(name, token, calls=0)
+            return
+        except BaseException:
+            _end(name, token)
+            raise
+        _end(name, token)
+        yield x
+
+
+def results() -> dict[str, Totals]:
+    """The phases in the order they first ran, with the time outside
+    all of them as "other" and the whole command as "total"."""
+    wall = time.perf_counter() - _start[0]
+    cpu = time.process_time() - _start[1]
+    res = dict(_totals)
+    other, total = Totals(), Totals()
+    other.wall, other.cpu = wall - _stack[0][0], cpu - _stack[0][1]
+    total.wall, total.cpu, total.calls = wall, cpu, 1
+    res['other'] = other
+    res['total'] = total
+    return res
+
+
+def report(res: dict[str, Totals]) -> str:
+    total = res['total'].wall or 1.0
+    tbl = Table(L, R, R, R, R)
+    tbl.append_row("Phase", "Wall (s)", "CPU (s)", "Calls", "Wall %")
+    for name, t in res.items():
+        tbl.append_row(name, f"{t.wall:.3f}", f"{t.cpu:.3f}",
+                       str(t.calls) if t.calls else "",
+                       f"{100 * t.wall / total:.1f}")
+    return str(tbl)
+
+
+def write_json(res: dict[str, Totals], f: typing.TextIO) -> None:
+    json.dump({
+        'version': FORMAT_VERSION,
+        'phases': [
+            {'name': name, 'wall': t.wall, 'cpu': t.cpu, 'calls': t.calls}
+            for name, t in res.items()
+        ]
+    }, f, indent=2)
+    f.write("\n")
@@ -1,13 +1,24 @@
+from __future__ import annotations
+
 import typing
 import os
+import sys
 import os.path
 import itertools
 import subprocess
 import time
-
-from . import simulate
+import signal
+import threading
+import math
+import random
+import multiprocessing
+import concurrent.futures
+from dataclasses import dataclass
+
+from . import datasets
 from . import messages
 from . import utils
+from . import perf_stats
 
 from .vis import Table, ColSpec
 
@@ -49,113 +60,633 @@ class perf_config:
             itertools.product(self.genomes, self.reads)
         )
 
+        # Seed for simulating the data, so we can reuse cached datasets
+        self.seed: int = config.get('seed', 0)
+
+
+def perf_setup(config: perf_config, cache_root: str | None,
+               verbose: bool) -> None:
+    datasets.setup('__PERF__', config.tools or {}, config.genomes,
+                   config.genomes_reads, config.seed, cache_root, verbose)
+
+
+OK = ""
+TIMEOUT = "TIMEOUT"
+SKIPPED = "SKIPPED"
+
+
+class Measurement(typing.NamedTuple):
+    wall: float    # seconds
+    user: float    # seconds of CPU time in user mode
+    sys: float     # seconds of CPU time in kernel mode
+    maxrss: float  # peak resident set size in bytes
+    cpus: str      # the CPUs the run was pinned to ("" if not pinned)
+    status: str = OK  # OK, TIMEOUT or SKIPPED; only OK runs are measured
+
+
+class Run(typing.NamedTuple):
+    tool: str
+    params: tuple[int, ...]
+    cmd: str
+    cwd: str
+    warmup: bool = False
+
+
+# The measurements we report, with the header and the scale we
+# report them in.
+METRICS: list[tuple[str, str, float]] = [
+    ("wall", "Wall time (s)", 1.0),
+    ("user", "User time (s)", 1.0),
+    ("sys", "System time (s)", 1.0),
+    ("maxrss", "Peak RSS (MB)", 1 << 20),
+]
+
+
+def unmeasured(status: str) -> Measurement:
+    return Measurement(math.nan, math.nan, math.nan, math.nan,
+                       _pinned_cpus, status)
+
+
+def run_measured(cmd: str, cwd: str, timeout: float | None = None
+                 ) -> tuple[int, Measurement]:
+    """Run cmd in a shell and measure the resources it uses.
+
+    Returns the exit code and the measurements. We wait for the
+    process with os.wait4 to get the resource usage of that process
+    alone (and the processes it waited for).
+
+    If the command runs for more than timeout seconds, we kill it,
+    and everything it started, and report it as a TIMEOUT."""
+    # With a timeout, the command runs in its own process group, so we
+    # can kill the tool along with the shell that runs it. Without one,
+    # it stays in ours, where Ctrl-C reaches it.
+    own_group = bool(timeout)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        args=cmd,
+        shell=True,
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=own_group
+    )
+    timed_out = threading.Event()
+
+    def kill_group() -> None:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:  # pragma: no cover -- already done
+            pass
+
+    def kill() -> None:
+        timed_out.set()
+        kill_group()
+
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.start()
+    try:
+        if not hasattr(os, 'wait4'):  # pragma: no cover -- not on Windows
+            returncode = proc.wait()
+            usage = None
+        else:
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = returncode = os.waitstatus_to_exitcode(status)
+        end = time.perf_counter()
+    except KeyboardInterrupt:
+        # Ctrl-C doesn't reach a process group of its own
+        if own_group:
+            kill_group()
+        proc.wait()
+        raise
+    finally:
+        if timer:
+            timer.cancel()
+
+    if timed_out.is_set():
+        return 0, unmeasured(TIMEOUT)
+    if usage is None:  # pragma: no cover
+        return returncode, Measurement(end - start, math.nan, math.nan,
+                                       math.nan, _pinned_cpus)
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    maxrss_scale = 1 if sys.platform == 'darwin' else 1024
+    return returncode, Measurement(
+        end - start, usage.ru_utime, usage.ru_stime,
+        usage.ru_maxrss * maxrss_scale, _pinned_cpus
+    )
+
+
+def format_cpus(cpus: typing.Iterable[int]) -> str:
+    """Format a set of CPUs as ranges, e.g. 0-3,8."""
+    ranges: list[list[int]] = []
+    for cpu in sorted(cpus):
+        if ranges and ranges[-1][-1] == cpu - 1:
+            ranges[-1][-1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        str(a) if a == b else f"{a}-{b}" for a, b in ranges
+    )
+
+
+def cpu_sets(jobs: int) -> list[set[int]]:
+    """Split the CPUs we may use into jobs disjoint sets of equal size."""
+    cpus = sorted(os.sched_getaffinity(0))
+    per_job = len(cpus) // jobs
+    if per_job == 0:
+        messages.error(f"Can't run {jobs} jobs on {len(cpus)} CPUs")
+    return [set(cpus[i*per_job:(i+1)*per_job]) for i in range(jobs)]
+
+
+# The CPUs the current (worker) process is pinned to.
+_pinned_cpus = ""
+
+
+def _pin_worker(cpu_queue: multiprocessing.Queue[set[int]]) -> None:
+    # Each worker takes its own set of CPUs. The processes it
+    # runs inherit the affinity.
+    global _pinned_cpus
+    cpus = cpu_queue.get()
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+        _pinned_cpus = format_cpus(cpus)
+
+
+def dominates(params: tuple[int, ...], other: tuple[int, ...]) -> bool:
+    "Is params at least as large as other in every parameter?"
+    return all(x >= y for x, y in zip(params, other))
+
+
+def run_all(runs: list[Run], jobs: int, timeout: float | None,
+            timed_out: dict[str, list[tuple[int, ...]]],
+            verbose: bool) -> typing.Iterator[tuple[Run, Measurement]]:
+    """Run and measure all runs, yielding measurements as they complete.
+
+    With more than one job, runs are executed concurrently by jobs
+    worker processes, each pinned to its own set of CPUs so they don't
+    compete for them. Runs with the same command in the same directory
+    are never executed concurrently, since they would write the same
+    files.
+
+    When a run times out, its parameters are added to timed_out for
+    its tool, and we skip the tool's runs on parameters that are at
+    least as large from then on."""
+
+    def check(run: Run, returncode: int, measurement: Measurement) -> None:
+        if returncode != 0:
+            messages.error(f"Command failed: {run.cmd}")
+        if measurement.status == TIMEOUT:
+            if verbose:
+                messages.message(f"timed out: {run.cmd}")
+            timed_out.setdefault(run.tool, []).append(run.params)
+
+    def skip(run: Run) -> bool:
+        return any(dominates(run.params, params)
+                   for params in timed_out.get(run.tool, []))
+
+    if jobs <= 1:
+        for run in runs:
+            if skip(run):
+                yield run, unmeasured(SKIPPED)
+                continue
+            if verbose:
+                print(f"running {run.cmd}")
+            returncode, measurement = run_measured(run.cmd, run.cwd, timeout)
+            check(run, returncode, measurement)
+            yield run, measurement
+        return
+
+    cpu_queue: multiprocessing.Queue[set[int]] = multiprocessing.Queue()
+    if hasattr(os, 'sched_setaffinity'):
+        for cpus in cpu_sets(jobs):
+            cpu_queue.put(cpus)
+    else:  # pragma: no cover
+        messages.warning("Can't pin jobs to CPUs on this platform.")
+        for _ in range(jobs):
+            cpu_queue.put(set())
+
+    pending = list(runs)
+    running: dict[concurrent.futures.Future[tuple[int, Measurement]],
+                  Run] = {}
+    with concurrent.futures.ProcessPoolExecutor(
+            jobs, initializer=_pin_worker, initargs=(cpu_queue,)) as pool:
+        while pending or running:
+            busy = {(run.cmd, run.cwd) for run in running.values()}
+            for run in list(pending):
+                if len(running) >= jobs:
+                    break
+                if skip(run):
+                    pending.remove(run)
+                    yield run, unmeasured(SKIPPED)
+                    continue
+                if (run.cmd, run.cwd) in busy:
+                    continue
+                if verbose:
+                    print(f"running {run.cmd}")
+                pending.remove(run)
+                busy.add((run.cmd, run.cwd))
+                running[pool.submit(
+                    run_measured, run.cmd, run.cwd, timeout
+                )] = run
+
+            if not running:
+                continue
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                run = running.pop(future)
+                returncode, measurement = future.result()
+                check(run, returncode, measurement)
+                yield run, measurement
+
+
+def format_metric(scale: float) -> typing.Callable[[float], str]:
+    def fmt(x: float) -> str:
+        return "NA" if math.isnan(x) else f"{x / scale:.6g}"
+    return fmt
+
+
+MetricFormat = tuple[str, str, typing.Callable[[typing.Any], str]]
 
-def perf_setup(config: perf_config, verbose: bool) -> None:
-    # Setting up directories
-    utils.check_make_dir('__PERF__', verbose)
-    utils.check_make_dir('__PERF__/data', verbose)
-    utils.check_make_dir('__PERF__/tools', verbose)
 
-    for tool in config.tools:
-        utils.check_make_dir(f'__PERF__/tools/{utils.tool_dir(tool)}', verbose)
+def report_metrics(jobs: int) -> list[MetricFormat]:
+    """The rows we report per run: measure, header and formatter."""
+    metrics: list[MetricFormat] = [
+        (metric, header, format_metric(scale))
+        for metric, header, scale in METRICS
+    ]
+    if jobs > 1:
+        metrics.append(("cpus", "CPUs", str))
+    return metrics
+
+
+@dataclass
+class perf_options:
+    repeats: int = 5
+    jobs: int = 1
+    warmup: int = 1
+    shuffle: bool = True
+    seed: int | None = None
+    raw: bool = False
+    profile: str | None = None  # profiling.MODES
+    timeout: float | None = None  # seconds per run
+    adaptive: float | None = None  # target relative CI width
+    budget: float = 300.0  # seconds of adaptive repeats per phase
+
+
+Cell = tuple[str, tuple[int, ...]]  # tool and parameters
+Results = dict[Cell, list[Measurement]]
+
+# Parameter columns (name and header) of the reports
+PREPROCESS_PARAMS = [
+    ("no_chrom", "Chromosomes"),
+    ("chrom_len", "Chromosome length"),
+]
+MAP_PARAMS = PREPROCESS_PARAMS + [
+    ("no_reads", "Number of reads"),
+    ("read_len", "Read length"),
+    ("edits", "Edits"),
+]
+
+
+class Phase(typing.NamedTuple):
+    name: str
+    params: list[tuple[str, str]]
+    results: Results
+
+
+def schedule(runs: list[Run], options: perf_options) -> list[Run]:
+    """Add warm-up runs and repeats, and interleave the runs.
+
+    All the warm-up runs go first. If options.shuffle is set, the
+    order of runs is randomised (seeded with options.seed), so drift
+    in the machine's performance doesn't systematically favour the
+    tools or datasets we happen to run first."""
+    rng = random.Random(options.seed)
+    warmups = [run._replace(warmup=True)
+               for run in runs for _ in range(options.warmup)]
+    measured = [run for run in runs for _ in range(options.repeats)]
+    if options.shuffle:
+        rng.shuffle(warmups)
+        rng.shuffle(measured)
+    return warmups + measured
+
+
+def unsettled(results: Results, target: float) -> list[Cell]:
+    """Cells where the confidence interval of the mean wall time is
+    wider than target relative to the mean."""
+    return [
+        cell for cell, ms in results.items()
+        if all(m.status == OK for m in ms) and
+        perf_stats.relative_ci_width([m.wall for m in ms]) > target
+    ]
 
-    # Simulating data
-    for k, n in config.genomes:
-        fasta_name = f"__PERF__/data/{utils.genome_name(n, k)}"
-        with open(fasta_name, 'w') as f:
-            simulate.simulate_genome(k, n, f)
 
-        bname = os.path.basename(fasta_name)
-        for tool in config.tools:
-            utils.relink(f"../../data/{bname}",
-                         f'__PERF__/tools/{utils.tool_dir(tool)}/{bname}')
+def measure(runs: list[Run], options: perf_options, verbose: bool
+            ) -> Results:
+    """Measure runs options.repeats times.
+
+    In adaptive mode, we then keep adding rounds with one more
+    repetition of each cell whose measurements are too noisy, until
+    they are all within the target or the time budget is spent. The
+    budget is for these extra rounds only; the first pass, with the
+    warmups and options.repeats of every cell, always runs in full."""
+    results: Results = {(run.tool, run.params): [] for run in runs}
+    timed_out: dict[str, list[tuple[int, ...]]] = {}
+    rng = random.Random(options.seed)
+    batch = schedule(runs, options)
+    adaptive_start: float | None = None  # when the first pass ended
+    while batch:
+        for run, measurement in run_all(batch, options.jobs, options.timeout,
+                                        timed_out, verbose):
+            if not run.warmup:
+                results[run.tool, run.params].append(measurement)
+
+        if adaptive_start is None:
+            adaptive_start = time.perf_counter()
+        if options.adaptive is None or \
+                time.perf_counter() - adaptive_start > options.budget:
+            break
+        noisy = set(unsettled(results, options.adaptive))
+        batch = [run for run in runs if (run.tool, run.params) in noisy]
+        if options.shuffle:
+            rng.shuffle(batch)
+    return results
+
+
+def profile_runs(phase: str, runs: list[Run], mode: str,
+                 verbose: bool) -> None:
+    """Run each run once with profiling switched on.
+
+    gsa's own tools write their profiles (see profiling.py) to
+    profile/<phase>-<params>.* in the tool's directory; other tools
+    just ignore the request."""
+    for run in runs:
+        profile_dir = os.path.join(run.cwd, 'profile')
+        os.makedirs(profile_dir, exist_ok=True)
+        prefix = os.path.join(
+            profile_dir, '-'.join(map(str, (phase,) + run.params))
+        )
+        if verbose:
+            messages.message(f"profiling {run.cmd}")
+        env = dict(os.environ,
+                   GSA_PROFILE=os.path.abspath(prefix),
+                   GSA_PROFILE_MODE=mode)
+        res = subprocess.run(
+            run.cmd, shell=True, cwd=run.cwd, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        if res.returncode != 0:
+            messages.error(f"Command failed: {run.cmd}")
 
-    for (k, n), (num, length, e) in config.genomes_reads:
-        fasta_name = f"__PERF__/data/{utils.genome_name(n, k)}"
-        fastq_name = f"__PERF__/data/{utils.reads_name(n, k, num, length, e)}"
-        with (open(fasta_name, 'r') as fasta_f,
-              open(fastq_name, 'w') as fastq_f):
-            simulate.simulate_reads(num, length, e, fasta_f, fastq_f)
 
-            bname = os.path.basename(fastq_name)
-            for tool in config.tools:
-                utils.relink(f"../../data/{bname}",
-                             f'__PERF__/tools/{utils.tool_dir(tool)}/{bname}')
+def report_table(params: list[tuple[str, str]],
+                 cols: list[tuple[str, str]]) -> Table:
+    "Table with parameter and result columns and a header row."
+    names = [name for name, _ in params + cols]
+    tbl = Table(
+        *(ColSpec(name, right_pad=", ") for name in names[:-1]),
+        ColSpec(names[-1])
+    )
+    tbl.append_row(*(header for _, header in params + cols))
+    return tbl
+
+
+def raw_report(params: list[tuple[str, str]],
+               cells: typing.Sequence[tuple[int, ...]],
+               tools: list[str],
+               results: Results,
+               options: perf_options) -> Table:
+    "Table with one row per measurement."
+    tbl = report_table(params, [("measure", "Measure")] +
+                       [(tool, tool) for tool in tools])
+    for metric, header, fmt in report_metrics(options.jobs):
+        for cell in cells:
+            # Adaptive mode may repeat some cells more than others
+            repeats = max(len(results[tool, cell]) for tool in tools)
+            for i in range(repeats):
+                row = tbl.add_row()
+                for (name, _), x in zip(params, cell):
+                    row[name] = x
+                row["measure"] = header
+                for tool in tools:
+                    ms = results[tool, cell]
+                    row[tool] = "" if i >= len(ms) else \
+                        ms[i].status or fmt(getattr(ms[i], metric))
+    return tbl
+
+
+def failed(ms: list[Measurement]) -> str:
+    "The status of a cell where a run timed out or was skipped."
+    return next((m.status for m in ms if m.status != OK), OK)
+
+
+def summary_report(params: list[tuple[str, str]],
+                   cells: typing.Sequence[tuple[int, ...]],
+                   tools: list[str],
+                   results: Results,
+                   options: perf_options) -> Table:
+    """Table with the median, minimum and IQR of the measurements, and
+    the number of outliers among them, per cell. For the CPUs the runs
+    were pinned to, just the distinct sets."""
+    stats = [("median", "median"), ("min", "min"),
+             ("iqr", "IQR"), ("outliers", "outliers")]
+    tbl = report_table(params, [("measure", "Measure")] + [
+        (f"{tool}:{stat}", f"{tool} {header}")
+        for tool in tools for stat, header in stats
+    ])
+    for metric, header, fmt in report_metrics(options.jobs):
+        for cell in cells:
+            row = tbl.add_row()
+            for (name, _), x in zip(params, cell):
+                row[name] = x
+            row["measure"] = header
+            for tool in tools:
+                status = failed(results[tool, cell])
+                if status:
+                    row[f"{tool}:median"] = status
+                    continue
+                if metric == "cpus":
+                    row[f"{tool}:median"] = " ".join(dict.fromkeys(
+                        m.cpus for m in results[tool, cell]
+                    ))
+                    continue
+                summary = perf_stats.summarise(
+                    getattr(m, metric) for m in results[tool, cell]
+                )
+                row[f"{tool}:median"] = fmt(summary.median)
+                row[f"{tool}:min"] = fmt(summary.min)
+                row[f"{tool}:iqr"] = fmt(summary.iqr)
+                row[f"{tool}:outliers"] = \
+                    " ".join(fmt(x) for x in summary.outliers) or "-"
+    return tbl
+
+
+# Measures derived from the median wall time and the parameters of a
+# cell: the header and a function of the tool, the cell's parameters
+# and the wall time.
+Derived = list[tuple[str, typing.Callable[[str, tuple[int, ...], float],
+                                          float]]]
+
+MAP_DERIVED: Derived = [
+    ("Reads/s", lambda _, p, wall: p[2] / wall),
+    ("Input bases/s", lambda _, p, wall: p[2] * p[3] / wall),
+    ("µs/read", lambda _, p, wall: wall * 1e6 / p[2]),
+]
+
+
+def artefact_size(tooldir: str, genome: str) -> int:
+    """Bytes on disk of the files a tool created from genome.
+
+    These are the files named genome.<something>, e.g.
+    genome.fa.exact_bwt, except for the links to our data."""
+    prefix = f"{genome}."
+    return sum(
+        entry.stat().st_size for entry in os.scandir(tooldir)
+        if entry.name.startswith(prefix) and
+        entry.is_file(follow_symlinks=False)
+    )
+
+
+def preprocess_derived(sizes: dict[Cell, int]) -> Derived:
+    return [
+        ("Input bases/s", lambda _, p, wall: p[0] * p[1] / wall),
+        ("Index size (bytes)", lambda tool, p, _: sizes[tool, p]),
+        ("Bytes/base", lambda tool, p, _: sizes[tool, p] / (p[0] * p[1])),
+    ]
 
 
-def dup(n: int, itr: typing.Iterable[T]) -> typing.Iterator[T]:
-    """Modifies the iterator itr so we get each element n times."""
-    for x in iter(itr):
-        for _ in range(n):
-            yield x
+def derived_report(params: list[tuple[str, str]],
+                   cells: typing.Sequence[tuple[int, ...]],
+                   tools: list[str],
+                   results: Results,
+                   derived: Derived) -> Table:
+    "Table with measures derived from the median wall time."
+    fmt = format_metric(1.0)
+    tbl = report_table(params, [("measure", "Measure")] +
+                       [(tool, tool) for tool in tools])
+    for header, f in derived:
+        for cell in cells:
+            row = tbl.add_row()
+            for (name, _), x in zip(params, cell):
+                row[name] = x
+            row["measure"] = header
+            for tool in tools:
+                ms = results[tool, cell]
+                wall = perf_stats.summarise(m.wall for m in ms).median
+                row[tool] = failed(ms) or \
+                    ("NA" if wall == 0 else fmt(f(tool, cell, wall)))
+    return tbl
+
+
+def report(out: typing.TextIO,
+           params: list[tuple[str, str]],
+           cells: typing.Sequence[tuple[int, ...]],
+           tools: list[str],
+           results: Results,
+           derived: Derived,
+           options: perf_options) -> None:
+    if options.raw:
+        raw_report(params, cells, tools, results, options).write(out)
+    else:
+        summary_report(params, cells, tools, results, options).write(out)
+    print(file=out)
+    derived_report(params, cells, tools, results, derived).write(out)
+
+
+# Measures we fit scaling exponents for, and the symbols we use for
+# the parameters in the report.
+SCALING_METRICS = [("wall", "time"), ("maxrss", "memory")]
+PARAM_SYMBOLS = {
+    "no_chrom": "k", "chrom_len": "n",
+    "no_reads": "r", "read_len": "m", "edits": "e",
+}
+
+
+def complexity_report(phases: list[Phase]) -> Table:
+    """Estimate how time and memory scale with each swept parameter.
+
+    For each tool and parameter, we fit a log-log regression of the
+    measurements against the parameter, with a separate intercept for
+    each combination of the other parameters, so the slope is the
+    exponent in, e.g., time ∝ n^slope."""
+    tbl = Table(ColSpec(right_pad=", "), ColSpec(right_pad=", "),
+                ColSpec(right_pad=", "), ColSpec(right_pad=", "), ColSpec())
+    tbl.append_row("Phase", "Tool", "Parameter", "Scaling", "95% CI")
+    for phase in phases:
+        tools = list(dict.fromkeys(tool for tool, _ in phase.results))
+        for i, (name, header) in enumerate(phase.params):
+            for tool in tools:
+                for metric, what in SCALING_METRICS:
+                    groups: dict[tuple[int, ...], list[tuple[float, float]]]
+                    groups = {}
+                    for (t, cell), ms in phase.results.items():
+                        if t != tool:
+                            continue
+                        rest = cell[:i] + cell[i+1:]
+                        groups.setdefault(rest, []).extend(
+                            (cell[i], getattr(m, metric)) for m in ms
+                        )
+                    fit = perf_stats.loglog_slope(groups.values())
+                    if fit is None:
+                        continue
+                    ci = "NA" if math.isnan(fit.lo) else \
+                        f"[{fit.lo:.2f}, {fit.hi:.2f}]"
+                    tbl.append_row(
+                        phase.name, tool, header,
+                        f"{what} ∝ {PARAM_SYMBOLS[name]}^{fit.slope:.2f}", ci
+                    )
+    return tbl
 
 
 def perf_preprocess(config: perf_config,
-                    repeats: int,
+                    options: perf_options,
                     out: typing.TextIO,
-                    verbose: bool) -> None:
+                    verbose: bool) -> Phase:
 
     prep_tools = [
         name for name, tool in config.tools.items() if 'preprocess' in tool
     ]
     if not prep_tools:
-        return
+        return Phase("preprocess", PREPROCESS_PARAMS, {})
 
     # No need to check this for all repeats, so just check at the beginning...
     for name in prep_tools:
-        tool = config.tools[name]
-        for k, n in dup(repeats, config.genomes):
+        for k, n in config.genomes:
             fastafile = f'__PERF__/tools/{utils.tool_dir(name)}/{utils.genome_name(n, k)}'  # noqal: E501
             if not os.path.isfile(fastafile):
                 messages.error(f"Genome file {fastafile} not found")
 
-    res_tbl = Table(
-        ColSpec("no_chrom", right_pad=", "),
-        ColSpec("chrom_len", right_pad=", "),
-        *(ColSpec(tool, right_pad=", ") for tool in prep_tools[:-1]),
-        ColSpec(prep_tools[-1])
-    )
-    # header
-    res_tbl.append_row(
-        "Chromosomes", "Chromosome length",
-        *prep_tools
-    )
-
-    for k, n in dup(repeats, config.genomes):
-        row = res_tbl.add_row()
-        row["no_chrom"] = k
-        row["chrom_len"] = n
-
+    runs: list[Run] = []
     for name in prep_tools:
         tool = config.tools[name]
         tooldir = f'__PERF__/tools/{utils.tool_dir(name)}'
-        for i, (k, n) in enumerate(dup(repeats, config.genomes)):
+        for k, n in config.genomes:
             cmd = tool['preprocess'].format(
                 genome=utils.genome_name(n, k),
                 root=config.relative_dir
             )
-            if verbose:
-                print(f"running {cmd}")
-            start = time.time()
-            res = subprocess.run(
-                args=cmd,
-                shell=True,
-                cwd=tooldir,
-                stdout=open(os.devnull, 'w'),
-                stderr=open(os.devnull, 'w')
-            )
-            if res.returncode != 0:
-                messages.error("Preprocessing failed!")
-            end = time.time()
-            res_tbl[i+1][name] = str(end-start)
-
-    print(res_tbl, file=out)
+            runs.append(Run(name, (k, n), cmd, tooldir))
+
+    results = measure(runs, options, verbose)
+    if options.profile:
+        profile_runs("preprocess", runs, options.profile, verbose)
+    sizes = {
+        (run.tool, run.params):
+            artefact_size(run.cwd, utils.genome_name(run.params[1],
+                                                     run.params[0]))
+        for run in runs
+    }
+    report(out, PREPROCESS_PARAMS, config.genomes, prep_tools,
+           results, preprocess_derived(sizes), options)
+    return Phase("preprocess", PREPROCESS_PARAMS, results)
 
 
 def perf_map(config: perf_config,
-             repeats: int,
+             options: perf_options,
              out: typing.TextIO,
-             verbose: bool) -> None:
+             verbose: bool) -> Phase:
 
     # Check files up front
     for name, tool in config.tools.items():
@@ -168,34 +699,10 @@ def perf_map(config: perf_config,
             if not os.path.isfile(fastqname):
                 messages.error(f"Couldn't find fast1 file {fastqname}")
 
-    tool_names = list(config.tools.keys())
-    res_tbl = Table(
-        ColSpec("no_chrom", right_pad=", "),
-        ColSpec("chrom_len", right_pad=", "),
-        ColSpec("no_reads", right_pad=", "),
-        ColSpec("read_len", right_pad=", "),
-        ColSpec("edits", right_pad=", "),
-        *(ColSpec(tool, right_pad=", ") for tool in tool_names[:-1]),
-        ColSpec(tool_names[-1])
-    )
-    res_tbl.append_row(
-        "Chromosomes", "Chromosome length",
-        "Number of reads", "Read length", "Edits",
-        *tool_names
-    )
-    for (k, n), (num, length, e) in dup(repeats, config.genomes_reads):
-        row = res_tbl.add_row()
-        row["no_chrom"] = k
-        row["chrom_len"] = n
-        row["no_reads"] = num
-        row["read_len"] = length
-        row["edits"] = e
-
+    runs: list[Run] = []
     for name, tool in config.tools.items():
         tooldir = f'__PERF__/tools/{utils.tool_dir(name)}'
-        for i, ((k, n), (num, length, e)) \
-                in enumerate(dup(repeats, config.genomes_reads)):
-
+        for (k, n), (num, length, e) in config.genomes_reads:
             cmd = tool['map'].format(
                 genome=utils.genome_name(n, k),
                 reads=utils.reads_name(n, k, num, length, e),
@@ -203,21 +710,13 @@ def perf_map(config: perf_config,
                 outfile=os.devnull,
                 root=config.relative_dir
             )
-
-            if verbose:
-                print(f"running {cmd}")
-
-            start = time.time()
-            res = subprocess.run(
-                args=cmd,
-                shell=True,
-                cwd=tooldir,
-                stdout=open(os.devnull, 'w'),
-                stderr=open(os.devnull, 'w')
-            )
-            if res.returncode != 0:
-                messages.error(f"Mapping failed for command: {cmd}")
-            end = time.time()
-            res_tbl[i+1][name] = str(end-start)
-
-    print(res_tbl, file=out)
+            runs.append(Run(name, (k, n, num, length, e), cmd, tooldir))
+
+    results = measure(runs, options, verbose)
+    if options.profile:
+        profile_runs("map", runs, options.profile, verbose)
+    cells = [(k, n, num, length, e)
+             for (k, n), (num, length, e) in config.genomes_reads]
+    report(out, MAP_PARAMS, cells, list(config.tools.keys()), results,
+           MAP_DERIVED, options)
+    return Phase("map", MAP_PARAMS, results)
@@ -1,13 +1,20 @@
 import typing
 import os
 import os.path
+import re
 import sys
+import shlex
 import itertools
 import subprocess
+import shutil
+import functools
+import concurrent.futures
 
-from . import simulate
+from . import cache
+from . import datasets
 from . import messages
 from . import utils
+from . import sam_compare
 from .vis import Table, ColSpec
 from .vis.cols import green, red, plain
 
@@ -52,41 +59,172 @@ class test_config:
             itertools.product(self.genomes, self.reads)
         )
 
+        # Seed for simulating the data, so we can reuse cached datasets
+        self.seed: int = config.get('seed', 0)
+
+
+def test_setup(config: test_config, cache_root: str | None,
+               verbose: bool) -> None:
+    datasets.setup('__TEST__', config.tools or {}, config.genomes,
+                   config.genomes_reads, config.seed, cache_root, verbose)
+
+
+class Command(typing.NamedTuple):
+    cmd: str
+    cwd: str
+    stamp: str | None = None   # file recording the last successful run
+    key: str | None = None     # what the stamp must hold to skip the run
+    output: str | None = None  # file the command must (still) produce
+
+
+# Programs that run a script or another program named in their
+# arguments. We can't tell what such a command depends on, so we
+# always run it.
+LAUNCHER = re.compile(
+    r'(python|pypy|perl|ruby|node|java|R|Rscript|env|sh|bash|zsh|nice|'
+    r'time|timeout|xargs)[0-9.]*(\.exe)?'
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _digest(fname: str) -> str:
+    return cache.file_digest(fname)
+
+
+@functools.lru_cache(maxsize=None)
+def _gsa_digest() -> str:
+    """Digest of gsa's own source, so changing gsa reruns its commands."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    sources: dict[str, str] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != '__pycache__')
+        for fname in sorted(filenames):
+            if fname.endswith('.py'):
+                path = os.path.join(dirpath, fname)
+                sources[os.path.relpath(path, root)] = _digest(path)
+    return cache.make_key(sources=sources)
+
+
+def stamp_key(cmd: str, cwd: str, inputs: list[str],
+              depends: str | None = None,
+              output: str | None = None) -> str | None:
+    """Key identifying a run: the command, the content of its input
+    files and of the files named in its arguments (other than its
+    output), the tool it runs and the key of the run it depends on
+    (the tool's preprocessing, for mapping).
+
+    For gsa, the tool is its source; for other tools, the modification
+    time of their binary. None if the command runs an interpreter or
+    launcher, or a program we can't find, since then we can't tell
+    what it runs."""
+    try:
+        argv = shlex.split(cmd)
+    except ValueError:
+        return None
+    program = argv[0] if argv else ''
+    name = os.path.basename(program)
+    if LAUNCHER.fullmatch(name):
+        return None
+    tool: str
+    if name == 'gsa':
+        tool = _gsa_digest()
+    else:
+        # The shell runs the command in cwd
+        binary = shutil.which(os.path.join(cwd, program)
+                              if os.sep in program else program) \
+            if program else None
+        if binary is None:
+            return None  # A rebuilt tool couldn't invalidate the stamp
+        tool = str(os.path.getmtime(binary))
+
+    files = list(inputs)
+    for arg in argv[1:]:
+        if arg not in files and arg != output and \
+                os.path.isfile(os.path.join(cwd, arg)):
+            files.append(arg)
+    return cache.make_key(
+        cmd=cmd,
+        inputs={fname: _digest(os.path.realpath(os.path.join(cwd, fname)))
+                for fname in files},
+        tool=tool,
+        depends=depends
+    )
 
-def test_setup(config: test_config, verbose: bool) -> None:
-    # Setting up directories
-    utils.check_make_dir('__TEST__', verbose)
-    utils.check_make_dir('__TEST__/data', verbose)
-    utils.check_make_dir('__TEST__/tools', verbose)
 
-    for tool in config.tools:
-        utils.check_make_dir(f'__TEST__/tools/{utils.tool_dir(tool)}', verbose)
+def stamp_name(tooldir: str, name: str) -> str:
+    return os.path.join(tooldir, '.stamps', f"{name}.stamp")
 
-    # Simulating data
-    for k, n in config.genomes:
-        fasta_name = f"__TEST__/data/{utils.genome_name(n, k)}"
-        with open(fasta_name, 'w') as f:
-            simulate.simulate_genome(k, n, f)
 
-        bname = os.path.basename(fasta_name)
-        for tool in config.tools:
-            utils.relink(f"../../data/{bname}",
-                         f'__TEST__/tools/{utils.tool_dir(tool)}/{bname}')
+def up_to_date(command: Command) -> bool:
+    if command.stamp is None or not os.path.isfile(command.stamp):
+        return False
+    if command.output is not None and \
+            not os.path.isfile(os.path.join(command.cwd, command.output)):
+        return False
+    with open(command.stamp) as f:
+        return f.read() == command.key
 
-    for (k, n), (num, length, e) in config.genomes_reads:
-        fasta_name = f"__TEST__/data/{utils.genome_name(n, k)}"
-        fastq_name = f"__TEST__/data/{utils.reads_name(n, k, num, length, e)}"
-        with (open(fasta_name, 'r') as fasta_f,
-              open(fastq_name, 'w') as fastq_f):
-            simulate.simulate_reads(num, length, e, fasta_f, fastq_f)
 
-            bname = os.path.basename(fastq_name)
-            for tool in config.tools:
-                utils.relink(f"../../data/{bname}",
-                             f'__TEST__/tools/{utils.tool_dir(tool)}/{bname}')
+def write_stamp(command: Command) -> None:
+    if command.stamp is None or command.key is None:
+        return
+    os.makedirs(os.path.dirname(command.stamp), exist_ok=True)
+    with open(command.stamp, 'w') as f:
+        f.write(command.key)
+
+
+def run_command(command: Command) -> subprocess.CompletedProcess[bytes]:
+    return subprocess.run(
+        args=command.cmd,
+        shell=True,
+        cwd=command.cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+
+
+def run_commands(what: str, commands: list[Command], jobs: int,
+                 force: bool, verbose: bool) -> None:
+    """Run independent commands, at most jobs at a time.
+
+    Commands whose stamps show that they already ran on the same
+    input are skipped, unless force is set. Every command runs even
+    if some fail; we report each failed command with the end of its
+    error output, and then give up."""
+    failed = 0
+    with concurrent.futures.ThreadPoolExecutor(max(1, jobs)) as pool:
+        futures = {}
+        for command in commands:
+            if not force and up_to_date(command):
+                if verbose:
+                    print("Up to date:", command.cmd)
+                continue
+            # Don't trust an old stamp if this run fails
+            if command.stamp is not None and os.path.exists(command.stamp):
+                os.remove(command.stamp)
+            if verbose:
+                print(f"{what}:", command.cmd)
+            futures[pool.submit(run_command, command)] = command
+        for future in concurrent.futures.as_completed(futures):
+            command, res = futures[future], future.result()
+            if res.returncode == 0:
+                write_stamp(command)
+            else:
+                failed += 1
+                err = res.stderr.decode(errors='replace').strip()
+                messages.warning(
+                    f"{what} failed (exit code {res.returncode}) in " +
+                    f"{command.cwd} for command: {command.cmd}" +
+                    (f"\n{err.splitlines()[-1]}" if err else "")
+                )
+    if failed:
+        messages.error(f"{what} failed for {failed} of " +
+                       f"{len(commands)} commands!")
 
 
-def test_preprocess(config: test_config, verbose: bool) -> None:
+def preprocess_commands(config: test_config) -> dict[tuple[str, str], Command]:
+    "The preprocessing commands, indexed by tool and genome file."
+    commands: dict[tuple[str, str], Command] = {}
     for name, tool in config.tools.items():
         if 'preprocess' in tool:
             for k, n in config.genomes:
@@ -99,20 +237,24 @@ def test_preprocess(config: test_config, verbose: bool) -> None:
                     genome=genomefile,
                     root=config.relative_dir
                 )
-                if verbose:
-                    print("Preprocessing:", cmd)
-                res = subprocess.run(
-                    args=cmd,
-                    shell=True,
-                    cwd=tooldir,
-                    stdout=open(os.devnull, 'w'),
-                    stderr=open(os.devnull, 'w')
+                commands[name, genomefile] = Command(
+                    cmd, tooldir,
+                    stamp=stamp_name(tooldir, f"preprocess-{genomefile}"),
+                    key=stamp_key(cmd, tooldir, [genomefile])
                 )
-                if res.returncode != 0:
-                    messages.error("Preprocessing failed!")
+    return commands
+
+
+def test_preprocess(config: test_config, jobs: int, force: bool,
+                    verbose: bool) -> None:
+    commands = list(preprocess_commands(config).values())
+    run_commands("Preprocessing", commands, jobs, force, verbose)
 
 
-def test_map(config: test_config, verbose: bool) -> None:
+def test_map(config: test_config, jobs: int, force: bool,
+             verbose: bool) -> None:
+    preprocessing = preprocess_commands(config)
+    commands: list[Command] = []
     for name, tool in config.tools.items():
         for (k, n), (num, length, e) in config.genomes_reads:
             tooldir = f'__TEST__/tools/{utils.tool_dir(name)}'
@@ -132,17 +274,19 @@ def test_map(config: test_config, verbose: bool) -> None:
                 outfile=outname,
                 root=config.relative_dir
             )
-            if verbose:
-                print("Mapping:", cmd)
-            res = subprocess.run(
-                args=cmd,
-                shell=True,
-                cwd=tooldir,
-                stdout=open(os.devnull, 'w'),
-                stderr=open(os.devnull, 'w')
-            )
-            if res.returncode != 0:
-                messages.error(f"Mapping failed for command: {cmd}")
+            prep = preprocessing.get((name, fastaname))
+            # If we can't tell when the preprocessing changes, we can't
+            # tell when the mapping must run again either.
+            key = None if prep is not None and prep.key is None else \
+                stamp_key(cmd, tooldir, [fastaname, fastqname],
+                          prep.key if prep else None, output=outname)
+            commands.append(Command(
+                cmd, tooldir,
+                stamp=stamp_name(tooldir, outname),
+                key=key,
+                output=outname
+            ))
+    run_commands("Mapping", commands, jobs, force, verbose)
 
 
 def sam_files(tool: str, config: test_config) -> list[str]:
@@ -152,37 +296,39 @@ def sam_files(tool: str, config: test_config) -> list[str]:
     ]
 
 
-def compare_files(fname1: str, fname2: str) -> bool:
+def compare_files(fname1: str, fname2: str) -> sam_compare.Comparison | None:
+    """Compare two SAM files, or None if we can't read them."""
     if not os.access(fname1, os.R_OK):
         messages.warning(f"Can't open file {fname1}")
-        return False
+        return None
 
     if not os.access(fname2, os.R_OK):
         messages.warning(f"Can't open file {fname2}")
-        return False
+        return None
 
-    with (open(fname1) as f1,
-          open(fname2) as f2):
-        return set(f1.readlines()) == set(f2.readlines())
+    return sam_compare.compare(fname1, fname2)
 
 
 def test_tool(ref_sams: list[str],
               tool_sams: list[str],
-              verbose: bool) -> list[bool]:
+              verbose: bool) -> list[sam_compare.Comparison | None]:
 
-    results = [False] * len(ref_sams)
-    tooltest = True
-    for i, (refsam, toolsam) in enumerate(zip(ref_sams, tool_sams)):
+    results: list[sam_compare.Comparison | None] = []
+    for refsam, toolsam in zip(ref_sams, tool_sams):
         if verbose:
             messages.message(f"Comparing: {refsam} vs {toolsam}", end="\t")
         cmp_res = compare_files(refsam, toolsam)
-        results[i] = cmp_res
-        tooltest &= cmp_res
+        results.append(cmp_res)
         if verbose:
-            if cmp_res:
+            if cmp_res is None:
+                messages.message("\u274c")
+            elif cmp_res.ok:
                 messages.message("\u2705")
             else:
-                messages.message("\u274c")
+                messages.message(
+                    f"\u274c {cmp_res.missing} missing, " +
+                    f"{cmp_res.extra} extra"
+                )
     return results
 
 
@@ -191,7 +337,7 @@ def test_compare(config: test_config,
                  verbose: bool) -> bool:
     success = True
     ref_sams = sam_files(config.reference, config)
-    res: dict[str, list[bool]] = {}
+    res: dict[str, list[sam_compare.Comparison | None]] = {}
     for tool in config.tools:
         if tool == config.reference:
             continue
@@ -224,8 +370,16 @@ def test_compare(config: test_config,
         row["no_reads"] = no_reads
         row["read_len"] = read_len
         row["edits"] = edits
-        for tool, bits in res.items():
-            row[tool] = ok_col("OK") if bits[i] else err_col("FAIL")
-            success = success and bits[i]
-    print(res_tbl, file=report_out)
+        for tool, comparisons in res.items():
+            cmp_res = comparisons[i]
+            if cmp_res is None:
+                row[tool] = err_col("FAIL")
+            elif cmp_res.ok:
+                row[tool] = ok_col("OK")
+            else:
+                row[tool] = err_col(
+                    f"FAIL (-{cmp_res.missing}/+{cmp_res.extra})"
+                )
+            success = success and cmp_res is not None and cmp_res.ok
+    res_tbl.write(report_out)
     return success
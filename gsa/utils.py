@@ -53,3 +53,27 @@ def out_name(genome_length: int, chromosomes: int,
 def tool_dir(tool: str) -> str:
     return tool
     # return shlex.escape(tool)
+
+
+SIZE_SUFFIXES = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def parse_size(size: str) -> int:
+    """Parse a byte size such as 512, 100K, 1.5G or 2GB."""
+    s = size.strip().upper().removesuffix('B')
+    suffix = s[-1:] if s[-1:] in SIZE_SUFFIXES else ''
+    try:
+        return int(float(s.removesuffix(suffix)) * SIZE_SUFFIXES[suffix])
+    except ValueError:
+        raise ValueError(f"Invalid size '{size}'")
+
+
+def format_size(size: float) -> str:
+    """Format a byte size in human readable form."""
+    if size < 1024:
+        return f"{size:.0f}"
+    for suffix in ['K', 'M', 'G']:
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f}{suffix}"
+    return f"{size / 1024:.1f}T"
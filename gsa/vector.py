@@ -0,0 +1,122 @@
+"""Vectorised exact matching of batches of short reads.
+
+Instead of running a search algorithm character by character for each
+read, we hash every window of a chromosome once per read length, look
+up the hashes of a whole batch of reads in the sorted window hashes,
+and verify the candidates, all with NumPy array operations.
+"""
+
+import typing
+import numpy as np
+import numpy.typing as npt
+
+# Polynomial hashes are computed modulo 2^64 (NumPy's uint64 arithmetic
+# wraps around). Collisions are weeded out when we verify the hits.
+BASE = 0x100000001B3
+
+Codes = npt.NDArray[np.uint8]
+Hashes = npt.NDArray[np.uint64]
+
+
+def encode(x: str) -> Codes:
+    return np.frombuffer(x.encode(), dtype=np.uint8)
+
+
+def _pow(k: int) -> np.uint64:
+    return np.uint64(pow(BASE, k, 1 << 64))
+
+
+def window_hashes(x: Codes, m: int) -> Hashes:
+    """Hashes of all length m windows of x.
+
+    The hash of w is sum(w[j] * BASE^(m-1-j)). We build hashes for
+    windows of length 2^i by doubling and combine those given by the
+    binary representation of m, so this takes O(n log m) time."""
+    n = len(x)
+    h = x.astype(np.uint64)  # hashes of windows of length k
+    k = 1
+    res: Hashes | None = None  # hashes of windows of length res_len
+    res_len = 0
+    while m:
+        if m & 1:
+            if res is None:
+                res, res_len = h, k
+            else:
+                w = n - res_len - k + 1
+                res = res[:w] * _pow(k) + h[res_len:res_len + w]
+                res_len += k
+        m >>= 1
+        if m:
+            h = h[:-k] * _pow(k) + h[k:]
+            k *= 2
+    assert res is not None
+    return res
+
+
+def read_hashes(reads: Codes) -> Hashes:
+    "Hashes of the rows in a (reads × m) matrix."
+    h = np.zeros(len(reads), dtype=np.uint64)
+    for j in range(reads.shape[1]):
+        h = h * np.uint64(BASE) + reads[:, j]
+    return h
+
+
+class Matcher:
+    """Exact matcher for one chromosome.
+
+    The sorted window hashes are kept for the last read length we
+    searched for, since reads usually come in one length."""
+
+    x: Codes
+    m: int
+    order: npt.NDArray[np.intp]
+    sorted_hashes: Hashes
+
+    def __init__(self, x: str) -> None:
+        self.x = encode(x)
+        self.m = -1
+
+    def _index(self, m: int) -> None:
+        if m == self.m:
+            return
+        hashes = window_hashes(self.x, m)
+        # Stable, so positions with the same hash stay sorted
+        self.order = np.argsort(hashes, kind='stable')
+        self.sorted_hashes = hashes[self.order]
+        self.m = m
+
+    def search(self, reads: list[str]) -> list[list[int]]:
+        """Positions where each of reads occur.
+
+        All reads must have the same length."""
+        m = len(reads[0])
+        assert all(len(p) == m for p in reads)
+        n = len(self.x)
+        if m == 0:
+            return [list(range(n + 1)) for _ in reads]
+        if m > n:
+            return [[] for _ in reads]
+
+        self._index(m)
+        codes = encode(''.join(reads)).reshape(len(reads), m)
+        q = read_hashes(codes)
+        lo = np.searchsorted(self.sorted_hashes, q, 'left')
+        hi = np.searchsorted(self.sorted_hashes, q, 'right')
+
+        # Flatten the candidate ranges order[lo[t]:hi[t]] into
+        # (read, position) pairs...
+        counts = hi - lo
+        read_idx = np.repeat(np.arange(len(reads)), counts)
+        starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        pos = self.order[np.arange(counts.sum()) + starts]
+
+        # ...and keep those that really match.
+        windows = np.lib.stride_tricks.sliding_window_view(self.x, m)
+        hits = (windows[pos] == codes[read_idx]).all(axis=1)
+        pos, read_idx = pos[hits], read_idx[hits]
+
+        ends = np.cumsum(np.bincount(read_idx, minlength=len(reads)))
+        return [
+            typing.cast(list[int], p.tolist())
+            for p in np.split(pos, ends[:-1])
+        ]
@@ -1,5 +1,8 @@
+from __future__ import annotations
 from typing import NamedTuple, TypeVar
-from collections import deque
+from bisect import insort
+from functools import reduce
+from operator import and_
 from .cols import Colour, plain, strip_ansi
 
 C = TypeVar('C', bound="colour")
@@ -24,73 +27,65 @@ class ColourSegment(_ColourSegment):  # pragma: no cover -- just for debugging
     __repr__ = __str__
 
 
-# There must be a better way to handle overlapping intervals,
-# but segmented text is short and I am ok with a hack that's
-# fast to impement...
-# This function merges lists of sorted non-overlapping segments
-# and with divide and conquer I get segmentation in O(n log n).
-def merge_segments(x: list[ColourSegment], y: list[ColourSegment]) \
+def resolve_segments(n: int, segments: list[ColourSegment]) \
         -> list[ColourSegment]:
-
+    """Split [0,n) into runs coloured by the segments covering them.
+
+    We sweep over the segment end points in sorted order, keeping the
+    segments that cover the current position, so this is O(k log k)
+    for k segments that don't overlap much. Where segments overlap,
+    their colours are combined in the order the segments were added,
+    so later colours take precedence. Positions no segment covers
+    are plain."""
+    events = sorted(
+        [(seg.start, 1, i) for i, seg in enumerate(segments)
+         if seg.start < seg.stop] +
+        [(seg.stop, -1, i) for i, seg in enumerate(segments)
+         if seg.start < seg.stop]
+    )
     res: list[ColourSegment] = []
-    while x and y:
-        a, b = x.pop(), y.pop()
-
-        if b.start >= a.stop:
-            # we can emit all of b and keep a
-            res.append(b)
-            x.append(a)
-        elif a.start >= b.stop:
-            # we can emit all of a and keep b
-            res.append(a)
-            y.append(b)
-
-        elif a.stop < b.stop:
-            # emit the non-overlapping part of b
-            res.append(ColourSegment(a.stop, b.stop, b.col))
-            if b.start < a.stop:  # if there is something left of b, keep it
-                y.append(ColourSegment(b.start, a.stop, b.col))
-            x.append(a)  # keep a
-
-        elif b.stop < a.stop:
-            # emit the non-overlapping part of a
-            res.append(ColourSegment(b.stop, a.stop, a.col))
-            if a.start < b.stop:  # if there is something left of b, keep it
-                x.append(ColourSegment(a.start, b.stop, a.col))
-            y.append(b)  # keep b
-
-        elif a.stop == b.stop:
-            # Now we split based on the starting point
-            if a.start < b.start:
-                # Do the overlap (if possible)
-                res.append(ColourSegment(b.start, b.stop, b.col & a.col))
-                x.append(ColourSegment(a.start, b.start, a.col))
+    active: list[int] = []  # covering segments, in the order they were added
+    run: tuple[int, ...] = ()
+    cur = 0
+
+    def emit(stop: int) -> None:
+        nonlocal run
+        if res and tuple(active) == run:
+            # Same segments as the last run, so extend it
+            res[-1] = ColourSegment(res[-1].start, stop, res[-1].col)
+            return
+        run = tuple(active)
+        col = reduce(and_, (segments[i].col for i in active)) \
+            if active else plain
+        res.append(ColourSegment(cur, stop, col))
+
+    j = 0
+    while j < len(events):
+        pos = events[j][0]
+        if cur < pos:
+            emit(pos)
+        while j < len(events) and events[j][0] == pos:
+            _, kind, i = events[j]
+            if kind > 0:
+                insort(active, i)
             else:
-                # Do the overlap (if possible)
-                res.append(ColourSegment(a.start, a.stop, a.col & b.col))
-                y.append(ColourSegment(b.start, a.start, b.col))
-
-        else:  # pragma: no cover
-            assert False, "We should have handled all cases"
-
-    res.extend(reversed(x))
-    res.extend(reversed(y))
-    res = res[::-1]
-
-    # FIXME: remove this check when I'm more sure that the merge works...
-    for i in range(len(res) - 1):
-        assert res[i].stop <= res[i+1].start
-
+                active.remove(i)
+            j += 1
+        cur = pos
+    if cur < n:
+        emit(n)
     return res
 
 
 class colour:
     x: str
     segments: list[ColourSegment]
+    _rendered: str | None  # cached until we add another segment
 
     def __init__(self, x: str):
         self.x = strip_ansi(x)
         self.segments = []
+        self._rendered = None
 
     # FIXME: I only use getitem to get slice syntax, but it is
     # a bit ugly...
@@ -116,37 +111,15 @@ class colour:
                 col
             )
         )
+        self._rendered = None
         return self
 
-    def _split_segments(self) -> None:
-        assert self.segments, "Should only be called with non-empty segments"
-
-        queue = deque([seg] for seg in self.segments)
-        while len(queue) > 1:
-            queue.append(merge_segments(queue.popleft(), queue.popleft()))
-        self.segments = queue[0]
-
-    def _complete_segments(self) -> None:
-        if not self.segments:
-            return
-
-        self._split_segments()
-        res: list[ColourSegment] = []
-        cur: int = 0
-        for seg in self.segments:
-            assert seg.start >= cur, \
-                "We cannot colour overlapping segments"
-            if cur < seg.start:
-                res.append(ColourSegment(cur, seg.start, plain))
-            res.append(seg)
-            cur = seg.stop
-        if cur < len(self.x):
-            res.append(ColourSegment(cur, len(self.x), plain))
-        self.segments = res
-
     def __str__(self) -> str:
-        self._complete_segments()
-        return "".join(
-            str(col(self.x[start:stop]))
-            for start, stop, col in self.segments
-        )
+        if self._rendered is None:
+            self._rendered = "".join(
+                str(col(self.x[start:stop]))
+                for start, stop, col in resolve_segments(
+                    len(self.x), self.segments
+                )
+            ) if self.segments else self.x
+        return self._rendered
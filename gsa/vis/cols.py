@@ -19,6 +19,8 @@ def strip_ansi(s: str) -> str:
 
 
 def ansifree_len(s: str) -> int:
+    if '\u001b' not in s:  # No escapes, so no need for the regex
+        return len(s)
     return len(strip_ansi(s))
 
 
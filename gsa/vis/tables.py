@@ -1,8 +1,9 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import Callable, Iterable, Iterator, overload, cast
-from .cols import ansi_align_left, ansi_align_right, ansifree_len
+from dataclasses import field
+from typing import Callable, Iterable, Iterator, TextIO, overload, cast
+from .cols import ansifree_len
 
 
 class Align(Enum):
@@ -17,6 +18,9 @@ class ColSpec:
     left_pad: str = ""
     right_pad: str = " "
     align: Align = Align.LEFT
+    # Fixed display width of the column. Columns without one are as
+    # wide as their widest cell, so we need all rows to lay them out.
+    width: int | None = None
 
 
 def _copy_spec(col: ColSpec, prefix: str) -> ColSpec:
@@ -24,7 +28,8 @@ def _copy_spec(col: ColSpec, prefix: str) -> ColSpec:
         name=prefix + col.name,
         left_pad=col.left_pad,
         right_pad=col.right_pad,
-        align=col.align
+        align=col.align,
+        width=col.width
     )
 
 
@@ -36,10 +41,29 @@ L = ColSpec()
 R = ColSpec(align=Align.RIGHT)
 
 
+def _cell_formatter(col: ColSpec, w: int) -> Callable[[str, int], str]:
+    """Format a cell, given its display width, in a column of width w."""
+    lpad, rpad = col.left_pad, col.right_pad
+    # FIXME: pattern match this when mypy can handle it
+    if col.align is Align.LEFT:
+        return lambda x, cw: lpad + x + ' ' * (w - cw) + rpad
+    elif col.align is Align.RIGHT:
+        return lambda x, cw: lpad + ' ' * (w - cw) + x + rpad
+    else:  # pragma: no cover
+        assert False, "Unknown alignment"
+
+
 @dataclass
 class Row:
     tbl: Table
     cells: list[str]
+    # Display widths of the cells, kept up to date as we set them, so
+    # we only strip colour codes once per cell.
+    widths: list[int] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if len(self.widths) != len(self.cells):
+            self.widths = [ansifree_len(cell) for cell in self.cells]
 
     def __iter__(self) -> Iterator[str]:
         return iter(self.cells)
@@ -61,12 +85,17 @@ class Row:
                     col: int | slice | str, val: object | Iterable[object]
                     ) -> None:
         if isinstance(col, int):
-            self.cells[col] = str(val)
+            cell = self.cells[col] = str(val)
+            self.widths[col] = ansifree_len(cell)
         elif isinstance(col, slice):
             # FIXME: check the length of the val object...
-            self.cells[col] = [str(v) for v in cast(Iterable[object], val)]
+            cells = [str(v) for v in cast(Iterable[object], val)]
+            self.cells[col] = cells
+            self.widths[col] = [ansifree_len(cell) for cell in cells]
         else:
-            self.cells[self.tbl.col_names[col]] = str(val)
+            i = self.tbl.col_names[col]
+            cell = self.cells[i] = str(val)
+            self.widths[i] = ansifree_len(cell)
 
 
 class Table:
@@ -92,48 +121,64 @@ class Table:
         return self  # For chaining
 
     def add_row(self) -> Row:
-        row = Row(self, [""] * len(self.cols))
+        n = len(self.cols)
+        row = Row(self, [""] * n, [0] * n)
         self.rows.append(row)
         return row
 
     def _get_col_widths(self) -> list[int]:
-        widths = [0] * len(self.cols)
+        widths = [
+            col.width if col.width is not None else 0 for col in self.cols
+        ]
+        fixed = [col.width is not None for col in self.cols]
         for row in self.rows:
-            for i, cell in enumerate(row):
-                widths[i] = max(widths[i], ansifree_len(cell))
+            for i, w in enumerate(row.widths):
+                if w > widths[i] and not fixed[i]:
+                    widths[i] = w
         return widths
 
-    def _formatters(self) -> list[Callable[[str], str]]:
-        colw = self._get_col_widths()
-        formatters: list[Callable[[str], str]] = []
+    def _formatters(self, widths: list[int]
+                    ) -> list[Callable[[str, int], str]]:
+        return [_cell_formatter(col, w) for col, w in zip(self.cols, widths)]
 
-        def left(w: int) -> Callable[[str], str]:
-            return lambda x: ansi_align_left(x, w)
+    def _format_row(self, formatters: list[Callable[[str, int], str]],
+                    cells: Iterable[str], widths: Iterable[int]) -> str:
+        return "".join(
+            fmt(x, w) for fmt, x, w in zip(formatters, cells, widths)
+        )
 
-        def right(w: int) -> Callable[[str], str]:
-            return lambda x: ansi_align_right(x, w)
-
-        for i in range(len(colw)):
-            # FIXME: pattern match this when mypy can handle it
-            if self.cols[i].align is Align.LEFT:
-                formatters.append(left(colw[i]))
-            elif self.cols[i].align is Align.RIGHT:
-                formatters.append(right(colw[i]))
-            else:  # pragma: no cover
-                assert False, "Unknown alignment"
-        return formatters
+    def lines(self) -> Iterator[str]:
+        """The formatted rows, one at a time."""
+        formatters = self._formatters(self._get_col_widths())
+        for row in self.rows:
+            yield self._format_row(formatters, row.cells, row.widths)
 
     def __str__(self) -> str:
-        formatters = self._formatters()
-        rows = []
-        for row in self.rows:
-            rows.append(
-                "".join(
-                    cspec.left_pad+fmt(x)+cspec.right_pad
-                    for fmt, cspec, x in zip(formatters, self.cols, row)
-                )
-            )
-        return "\n".join(rows)
+        return "\n".join(self.lines())
+
+    def write(self, out: TextIO) -> None:
+        """Write the table to out a row at a time, so we never hold
+        the whole formatted table in memory."""
+        for line in self.lines():
+            out.write(line)
+            out.write("\n")
+
+    def write_row(self, out: TextIO, *cells: str) -> None:
+        """Write a row to out without adding it to the table.
+
+        The columns get their fixed widths, so we can write rows before
+        we have them all; columns without a fixed width aren't padded,
+        and cells wider than their column aren't cut."""
+        widths = [
+            col.width if col.width is not None else 0 for col in self.cols
+        ]
+        cells = cells + ("",) * (len(self.cols) - len(cells))
+        cell_widths = [ansifree_len(x) for x in cells]
+        formatters = self._formatters([
+            max(w, cw) for w, cw in zip(widths, cell_widths)
+        ])
+        out.write(self._format_row(formatters, cells, cell_widths))
+        out.write("\n")
 
     def __iter__(self) -> Iterator[Row]:
         return iter(self.rows)
@@ -147,8 +192,8 @@ class Table:
         m = max(len(self), len(other))
         for _ in range(m):
             new.add_row()
-        for i in range(len(self)):
-            new[i][0:n1] = self[i].cells
-        for i in range(len(other)):
-            new[i][n1:n1+n2] = other[i].cells
+        for i, row in enumerate(self.rows):
+            new[i][0:n1] = row.cells
+        for i, row in enumerate(other.rows):
+            new[i][n1:n1+n2] = row.cells
         return new
@@ -16,6 +16,7 @@ setup(
         'colorama',
         'types-colorama',
         'pyyaml',
+        'numpy',
         'pystr @ git+https://github.com/mailund/pystr#egg=pystr'
     ],
 )
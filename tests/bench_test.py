@@ -0,0 +1,19 @@
+from gsa import bench
+
+
+def test_bench() -> None:
+    data = bench.simulate_dataset(1, 200, 5, 10, 0, seed=1)
+    selected = bench.engines(["exact naive", "exact bwt"])
+    assert [label for label, _, _ in selected] == \
+        ["exact naive", "exact bwt"]
+
+    tbl = bench.bench(selected, data, min_time=0.0, repeats=1)
+    rows = [list(row) for row in tbl]
+    assert rows[0] == ["Engine"] + bench.PHASES + ["total"]
+    naive, bwt = (dict(zip(rows[0], row)) for row in rows[1:])
+    assert naive["Engine"] == "exact naive"
+    # An online engine has nothing to preprocess or load
+    assert naive["preprocess"] == naive["load"] == "-"
+    assert bwt["Engine"] == "exact bwt"
+    for phase in bench.PHASES + ["total"]:
+        assert bwt[phase].endswith("s")
@@ -0,0 +1,80 @@
+import os
+import typing
+
+from gsa import cache
+
+
+def write_bytes(data: bytes) -> typing.Callable[[typing.BinaryIO], None]:
+    def write(f: typing.BinaryIO) -> None:
+        f.write(data)
+    return write
+
+
+def test_store_lookup(tmp_path: typing.Any) -> None:
+    root = str(tmp_path)
+    key = cache.make_key(genome="abc", method="exact_bwt", params={})
+    assert cache.lookup(root, key) is None
+
+    path = cache.store(root, key, write_bytes(b"tables"),
+                       {'method': 'exact_bwt'}, limit=1000)
+    assert cache.lookup(root, key) == path
+    with open(path, 'rb') as f:
+        assert f.read() == b"tables"
+
+    entries = cache.entries(root)
+    assert [e.key for e in entries] == [key]
+    assert entries[0].meta['method'] == 'exact_bwt'
+    # No temporary files left behind
+    assert sorted(os.listdir(root)) == [f"{key}.data", f"{key}.json"]
+
+
+def test_keys_differ() -> None:
+    k1 = cache.make_key(genome="abc", method="exact_bwt", params={})
+    k2 = cache.make_key(genome="abc", method="approx_bwt", params={})
+    k3 = cache.make_key(genome="abd", method="exact_bwt", params={})
+    assert len({k1, k2, k3}) == 3
+    assert k1 == cache.make_key(method="exact_bwt", genome="abc", params={})
+
+
+def test_lru_eviction(tmp_path: typing.Any) -> None:
+    root = str(tmp_path)
+    keys = [cache.make_key(i=i) for i in range(3)]
+    for i, key in enumerate(keys):
+        path = cache.store(root, key, write_bytes(b"x" * 10), {}, limit=30)
+        os.utime(path, (i, i))  # make the use order explicit
+
+    # Use the oldest, so the second becomes least recently used
+    assert cache.lookup(root, keys[0]) is not None
+    k4 = cache.make_key(i=3)
+    cache.store(root, k4, write_bytes(b"x" * 10), {}, limit=30)
+    assert cache.lookup(root, keys[1]) is None
+    assert {e.key for e in cache.entries(root)} == {keys[0], keys[2], k4}
+
+    cache.prune(root, 0)
+    assert cache.entries(root) == []
+
+
+def test_concurrent_removal(tmp_path: typing.Any) -> None:
+    root = str(tmp_path)
+    key = cache.make_key(i=0)
+    cache.store(root, key, write_bytes(b"x"), {}, limit=10)
+    # Another process evicting the entry under our feet
+    cache.remove(root, key)
+    cache.remove(root, key)
+    assert cache.lookup(root, key) is None
+    # An orphaned metadata file without data isn't an entry
+    with open(os.path.join(root, f"{key}.json"), 'w') as f:
+        f.write("{}")
+    assert cache.entries(root) == []
+
+
+def test_entries_are_shareable(tmp_path: typing.Any) -> None:
+    root = str(tmp_path)
+    key = cache.make_key(i=0)
+    old = os.umask(0o022)
+    try:
+        path = cache.store(root, key, write_bytes(b"x"), {}, limit=10)
+    finally:
+        os.umask(old)
+    for fname in (path, os.path.join(root, f"{key}.json")):
+        assert os.stat(fname).st_mode & 0o777 == 0o644
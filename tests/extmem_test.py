@@ -0,0 +1,36 @@
+import os
+import random
+import typing
+
+from gsa import extmem, fasta
+
+
+def naive(x: str, p: str) -> list[int]:
+    return [i for i in range(len(x) - len(p) + 1) if x[i:i+len(p)] == p]
+
+
+def test_external_index(tmp_path: typing.Any) -> None:
+    genome = {
+        "chr1": ''.join(random.choice("acgt") for _ in range(2500)),
+        "chr2": ''.join(random.choice("ac") for _ in range(1500)),
+        "repeats": "a" * 1200,
+    }
+    fasta_name = os.path.join(tmp_path, "genome.fa")
+    index_name = fasta_name + ".exact_bwt"
+    with open(fasta_name, 'w') as f:
+        fasta.write_fasta(f, genome)
+
+    # A small budget, so we have to merge several sorted runs
+    with open(index_name, 'wb') as index_file:
+        extmem.build_index(fasta_name, index_file, 128 * 1024)
+    assert extmem.is_index(index_name)
+    assert not extmem.is_index(fasta_name)
+
+    index = extmem.read_index(index_name)
+    assert list(index) == list(genome)
+    for chrname, x in genome.items():
+        for _ in range(50):
+            i = random.randrange(len(x))
+            p = x[i:i + random.randrange(1, 10)]
+            assert sorted(index[chrname].search(p)) == naive(x, p)
+        assert list(index[chrname].search("acgtn")) == []
@@ -0,0 +1,52 @@
+import io
+import argparse
+
+import pytest
+
+from gsa import perf_results
+from gsa.tool_perf import Measurement, TIMEOUT, unmeasured
+
+
+def record(tool: str, wall: float) -> perf_results.Record:
+    return perf_results.Record(
+        "map", tool, {"no_chrom": 1, "chrom_len": 100},
+        [Measurement(wall, 0.0, 0.0, 1024.0, "")] * 3
+    )
+
+
+def test_parse_tolerance() -> None:
+    assert perf_results.parse_tolerance("10%") == 0.1
+    assert perf_results.parse_tolerance("0.25") == 0.25
+    with pytest.raises(argparse.ArgumentTypeError):
+        perf_results.parse_tolerance("ten%")
+
+
+def test_json_round_trip() -> None:
+    recs = [record("a", 1.0), record("b", float('nan'))]
+    f = io.StringIO()
+    perf_results.write_json(recs, f)
+    f.seek(0)
+    f.name = "results.json"
+    back = perf_results.read_json(f)
+    assert [r.key for r in back] == [r.key for r in recs]
+    assert back[0] == recs[0]
+
+
+def test_compare() -> None:
+    baseline = [record("a", 1.0), record("b", 1.0), record("c", 1.0)]
+    current = [record("a", 1.05), record("b", 1.5), record("c", 0.5)]
+    tbl, regressions = perf_results.compare(current, baseline, 0.1, False)
+    assert regressions == 1
+    assert len(tbl) == 1 + 2 * 3  # header and wall/RSS rows per tool
+
+
+def test_compare_timeout_is_regression() -> None:
+    baseline = [record("a", 1.0)]
+    current = [perf_results.Record(
+        "map", "a", {"no_chrom": 1, "chrom_len": 100},
+        [unmeasured(TIMEOUT)] * 3
+    )]
+    tbl, regressions = perf_results.compare(current, baseline, 0.1, False)
+    assert regressions == 2  # wall and RSS
+    assert len(tbl) == 1 + 2
+    assert str(tbl).count("timeout") == 2
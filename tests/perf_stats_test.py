@@ -0,0 +1,41 @@
+import math
+
+from gsa import perf_stats
+
+
+def test_quantile() -> None:
+    xs = [1.0, 2.0, 3.0, 4.0]
+    assert perf_stats.quantile(xs, 0.0) == 1.0
+    assert perf_stats.quantile(xs, 1.0) == 4.0
+    assert perf_stats.quantile(xs, 0.5) == 2.5
+    assert math.isnan(perf_stats.quantile([], 0.5))
+
+
+def test_summarise() -> None:
+    s = perf_stats.summarise([1.0, 1.1, 0.9, 1.0, 10.0, math.nan])
+    assert s.n == 5
+    assert s.median == 1.0
+    assert s.min == 0.9
+    assert s.outliers == [10.0]
+
+
+def test_loglog_slope() -> None:
+    # y = c * x^2 with different constants in the two groups
+    groups = [
+        [(x, 3 * x ** 2 * (1 + 0.01 * (-1) ** i))
+         for i, x in enumerate([10, 20, 40, 80])],
+        [(x, 7 * x ** 2) for x in [10, 20, 40]],
+    ]
+    fit = perf_stats.loglog_slope(groups)
+    assert fit is not None
+    assert abs(fit.slope - 2) < 0.05
+    assert fit.lo <= fit.slope <= fit.hi
+    assert perf_stats.loglog_slope([[(10, 1.0), (10, 2.0)]]) is None
+
+
+def test_relative_ci_width() -> None:
+    assert perf_stats.relative_ci_width([1.0]) == math.inf
+    assert perf_stats.relative_ci_width([2.0, 2.0, 2.0]) == 0.0
+    wide = perf_stats.relative_ci_width([1.0, 2.0, 3.0])
+    narrow = perf_stats.relative_ci_width([1.9, 2.0, 2.1] * 5)
+    assert narrow < wide
@@ -0,0 +1,22 @@
+import io
+
+import pytest
+
+from gsa import progress
+
+
+def test_format_duration() -> None:
+    assert progress.format_duration(5) == "0:05"
+    assert progress.format_duration(125.7) == "2:05"
+    assert progress.format_duration(3725) == "1:02:05"
+
+
+def test_reads(monkeypatch: pytest.MonkeyPatch,
+               capsys: pytest.CaptureFixture[str]) -> None:
+    monkeypatch.setattr(progress, '_enabled', False)
+    xs = list(range(10))
+    assert progress.reads(xs, io.StringIO()) is xs
+
+    monkeypatch.setattr(progress, '_enabled', True)
+    assert list(progress.reads(xs, io.StringIO())) == xs
+    assert capsys.readouterr().err.startswith("10 reads")
@@ -0,0 +1,31 @@
+from gsa import run_stats
+
+
+def test_counts_and_histogram() -> None:
+    stats = run_stats.RunStats()
+    written = []
+    record = stats.counted(lambda *args: written.append(args))
+    for readname, ns, chroms in [("a", 0, []), ("b", 5, ["x"]),
+                                 ("c", 100, ["x", "y", "y"])]:
+        for chrname in chroms:
+            record(None, readname, chrname, 0, "1M", "a")
+        stats.read_done(readname, ns)
+
+    assert len(written) == 4
+    assert (stats.reads, stats.no_hits, stats.one_hit, stats.many_hits) \
+        == (3, 1, 1, 1)
+    assert stats.chromosome_hits == {"x": 2, "y": 2}
+    # 0 ns in bucket 0, 5 ns in [4, 8), 100 ns in [64, 128)
+    assert stats.latencies[0] == 1 and stats.latencies[3] == 1
+    assert stats.latencies[7] == 1 and sum(stats.latencies) == 3
+    assert stats.latency_quantile(0.5) == 8
+    assert stats.latency_quantile(0.99) == 128
+    assert [r["read"] for r in stats.to_json()["slowest_reads"]] \
+        == ["c", "b", "a"]
+
+
+def test_timed_reads() -> None:
+    stats = run_stats.RunStats()
+    reads = [("r1", "acgt"), ("r2", "gtca")]
+    assert list(stats.timed_reads(reads)) == reads
+    assert stats.reads == 2 and sum(stats.latencies) == 2
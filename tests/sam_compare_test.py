@@ -0,0 +1,57 @@
+import os
+import typing
+
+from gsa import sam_compare
+
+
+def write(tmp_path: typing.Any, name: str, lines: list[str]) -> str:
+    fname = os.path.join(tmp_path, name)
+    with open(fname, 'w') as f:
+        f.writelines(line + '\n' for line in lines)
+    return fname
+
+
+def test_compare(tmp_path: typing.Any, monkeypatch: typing.Any) -> None:
+    # Small runs, so the external sort merges several of them
+    monkeypatch.setattr(sam_compare, 'RUN_SIZE', 2)
+    ref = write(tmp_path, "ref.sam", [
+        "@HD\tVN:1.0",
+        "read0\tchr1\t1\t3M\tacg",
+        "read1\tchr1\t5\t3M\tttt",
+        "read1\tchr2\t5\t3M\tttt",
+        "read2\tchr1\t9\t3M\tgga",
+    ])
+    same = write(tmp_path, "same.sam", [
+        "read2  chr1  9  3M  gga",
+        "read1\tchr2\t5\t3M\tttt",
+        "read0\tchr1\t1\t3M\tacg",
+        "",
+        "read1\tchr1\t5\t3M\tttt",
+    ])
+    other = write(tmp_path, "other.sam", [
+        "read0\tchr1\t1\t3M\tacg",
+        "read0\tchr1\t1\t3M\tacg",
+        "read1\tchr1\t5\t3M\tttt",
+        "read3\tchr1\t7\t3M\tccc",
+    ])
+    assert sam_compare.compare(ref, same) == sam_compare.Comparison(0, 0)
+    assert sam_compare.compare(ref, same).ok
+    # read1 on chr2 and read2 are missing; the duplicate read0 and
+    # read3 are extra.
+    assert sam_compare.compare(ref, other) == sam_compare.Comparison(2, 2)
+
+
+def test_compare_prefix_records(tmp_path: typing.Any,
+                                monkeypatch: typing.Any) -> None:
+    # A record that is a prefix of another up to a tab must still sort
+    # first when merging the runs (as "\t" < "\n").
+    monkeypatch.setattr(sam_compare, 'RUN_SIZE', 2)
+    rec = "read0\tchr1\t1\t3M\tacg"
+    last = "read9\tchr1\t1\t3M\tacg"
+    ref = write(tmp_path, "ref.sam", [
+        rec + "\tNM:i:0", last, rec, rec + "\tNM:i:1",
+    ])
+    other = write(tmp_path, "other.sam", [
+        rec, rec + "\tNM:i:0", rec + "\tNM:i:1", last, "read5\tchr2",
+    ])
+    assert sam_compare.compare(ref, other) == sam_compare.Comparison(0, 1)
@@ -0,0 +1,32 @@
+import os
+import pickle
+import typing
+
+import pytest
+
+from gsa import search_methods
+
+
+def test_preprocessed_round_trip(tmp_path: typing.Any) -> None:
+    fname = os.path.join(tmp_path, "genome.fa.prep")
+    with open(fname, 'wb') as f:
+        search_methods.write_preprocessed(
+            f, ["chr1", "chr2"], [("chr2", [2]), ("chr1", [1])]
+        )
+    tables = search_methods.read_preprocessed(fname)
+    assert list(tables.items()) == [("chr1", [1]), ("chr2", [2])]
+
+
+def test_preprocessed_old_formats(tmp_path: typing.Any) -> None:
+    fname = os.path.join(tmp_path, "genome.fa.prep")
+    # A single dict, from before the header
+    with open(fname, 'wb') as f:
+        pickle.dump({"chr1": [1]}, f)
+    assert search_methods.read_preprocessed(fname) == {"chr1": [1]}
+
+    # A stream of chromosomes without the header
+    with open(fname, 'wb') as f:
+        pickle.dump(["chr1"], f)
+        pickle.dump(("chr1", [1]), f)
+    with pytest.raises(SystemExit):
+        search_methods.read_preprocessed(fname)
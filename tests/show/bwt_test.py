@@ -0,0 +1,47 @@
+from gsa.show.bwt import window, RotationTable
+
+
+def test_window() -> None:
+    assert window([3], None) is None
+    assert window([5], 2) == [range(3, 8)]
+    # Clipped at the first row
+    assert window([1], 3) == [range(0, 5)]
+    # Overlapping and touching windows are merged, whatever the order
+    assert window([5, 2], 2) == [range(0, 8)]
+    assert window([0, 5], 2) == [range(0, 8)]
+    assert window([0, 6], 2) == [range(0, 3), range(4, 9)]
+
+
+def rotation_table(view: list[range] | None) -> RotationTable:
+    x = "mississippi$"
+    sa = sorted(range(len(x)), key=lambda i: x[i:])
+    return RotationTable(x, sa, view)
+
+
+def test_rotation_table() -> None:
+    tbl = rotation_table(None)
+    n = len(tbl.sa) + 1
+    assert len(tbl) == n
+    assert list(tbl.visible(0, n)) == list(range(n))
+    for i, j in enumerate(tbl.sa):
+        assert tbl[i]["rotation"] == tbl.x[j:] + tbl.x[:j]
+    assert tbl[-1]["rotation"] == ""
+
+
+def test_rotation_table_view() -> None:
+    # Clipped to the rows there are
+    tbl = rotation_table([range(2, 4), range(9, 20)])
+    n = len(tbl.sa) + 1
+    assert tbl.view == [range(2, 4), range(9, n)]
+    # Skipped rows, two shown, skipped rows, the rest shown
+    assert len(tbl) == 1 + 2 + 1 + (n - 9)
+    assert list(tbl.visible(0, n)) == [2, 3] + list(range(9, n))
+    assert list(tbl.visible(3, 10)) == [3, 9]
+
+    # Rows are indexed by rank whether we show them or not
+    for i, j in enumerate(tbl.sa):
+        assert tbl[i]["rotation"] == tbl.x[j:] + tbl.x[:j]
+    tbl[2]["pointer"] = "k ->"
+    out = str(tbl)
+    assert "k ->" in out
+    assert "... 2 rows ..." in out and "... 5 rows ..." in out
@@ -0,0 +1,45 @@
+import io
+import json
+import random
+
+from gsa.show.lcp import lcp_trace, lcp_from_sa
+from gsa.show.trace import Trace
+
+
+def prefix_len(x: str, i: int, j: int) -> int:
+    n = 0
+    while i + n < len(x) and j + n < len(x) and x[i + n] == x[j + n]:
+        n += 1
+    return n
+
+
+def strings() -> list[str]:
+    random.seed(0)
+    return ["mississippi", "aaaaaaa", "abcabcab"] + [
+        ''.join(random.choice("ab") for _ in range(random.randrange(1, 30)))
+        for _ in range(20)
+    ]
+
+
+def test_lcp_trace() -> None:
+    for x in strings():
+        sa = sorted(range(len(x)), key=lambda i: x[i:])
+        expected = [0] + [prefix_len(x, sa[i - 1], sa[i])
+                          for i in range(1, len(sa))]
+        f = io.StringIO()
+        assert lcp_trace(x, sa, Trace(f)) == expected
+        # The visualised version computes the same array
+        assert lcp_from_sa(x, sa, interactive=False) == expected
+
+        events = [json.loads(line) for line in f.getvalue().splitlines()]
+        assert events[0] == {'event': 'start', 'x': x, 'sa': sa}
+        assert events[-1] == {'event': 'done', 'lcp': expected}
+        lcps = events[1:-1]
+        # One event per suffix, in the order they appear in x
+        assert [e['i'] for e in lcps] == list(range(len(x)))
+        for e in lcps:
+            assert e['event'] == 'lcp'
+            assert sa[e['ii']] == e['i']
+            assert e['lcp'] == expected[e['ii']]
+            assert e['j'] == (sa[e['ii'] - 1] if e['ii'] else None)
+            assert 0 <= e['offset'] <= e['lcp']
@@ -0,0 +1,55 @@
+import io
+import json
+import random
+import typing
+
+from gsa.show import skew
+from gsa.show.trace import Trace
+
+
+def strings() -> list[str]:
+    random.seed(0)
+    return ["mississippi", "aaaaaaa", "abcabcab"] + [
+        ''.join(random.choice("ab") for _ in range(random.randrange(1, 30)))
+        for _ in range(20)
+    ]
+
+
+def test_less() -> None:
+    for s in strings():
+        x, _ = skew.remap_str(s)
+        sa12 = sorted((i for i in range(len(x)) if i % 3 != 0),
+                      key=lambda i: x[i:])
+        isa = {j: i for i, j in enumerate(sa12)}
+        for ii in sa12:
+            for jj in range(0, len(x), 3):
+                assert skew.less(ii, jj, x, isa) == (x[ii:] < x[jj:])
+
+
+def test_skew_trace(monkeypatch: typing.Any) -> None:
+    monkeypatch.setattr(skew, 'INTERACTIVE', False)
+    for s in strings():
+        x, alpha = skew.remap_str(s)
+        expected = sorted(range(len(x)), key=lambda i: x[i:])
+        f = io.StringIO()
+        assert skew.skew_trace(x, len(alpha) + 2, Trace(f)) == expected
+        # The visualised version computes the same suffix array
+        assert skew.skew_rec(x, alpha) == expected
+
+        events = [json.loads(line) for line in f.getvalue().splitlines()]
+        top = [e for e in events if e['depth'] == 0]
+        assert top[0] == {'event': 'skew', 'depth': 0, 'x': x}
+        assert top[-1] == {'event': 'done', 'depth': 0, 'sa': expected}
+        assert [e['offset'] for e in top if e['event'] == 'radix'] == \
+            [2, 1, 0]
+        sa3 = next(e['sa3'] for e in top if e['event'] == 'sa3_sorted')
+        assert sa3 == sorted(sa3, key=lambda i: x[i:])
+        # The merge takes the suffixes in sorted order
+        merged = [e['sa'] for e in top if e['event'] == 'merge']
+        assert merged == expected[:len(merged)]
+
+        # Each recursion sorts the string it says it recurses on
+        for i, e in enumerate(events):
+            if e['event'] == 'recurse':
+                assert events[i + 1] == \
+                    {'event': 'skew', 'depth': e['depth'] + 1, 'x': e['u']}
@@ -0,0 +1,16 @@
+import io
+import json
+
+from gsa.show.trace import Trace
+
+
+def test_trace() -> None:
+    f = io.StringIO()
+    trace = Trace(f)
+    trace('start', x="abc", sa=[0, 1, 2])
+    trace('done')
+    assert trace.events == 2
+    assert [json.loads(line) for line in f.getvalue().splitlines()] == [
+        {'event': 'start', 'x': "abc", 'sa': [0, 1, 2]},
+        {'event': 'done'},
+    ]
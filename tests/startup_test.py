@@ -0,0 +1,33 @@
+import sys
+import subprocess
+
+# Modules only some commands need, and that gsa shouldn't import
+# before it knows which command it is running.
+HEAVY = ['yaml', 'numpy', 'pystr', 'gsa.show.bwt', 'gsa.tool_perf',
+         'gsa.search_methods']
+
+# Modules only some search engines need
+HEAVY_ENGINES = ['yaml', 'numpy', 'pystr.bwt', 'pystr.suffixtree',
+                 'gsa.show.bwt', 'gsa.tool_perf', 'gsa.vector']
+
+
+def loaded(argv: list[str], modules: list[str]) -> list[str]:
+    """The modules that are loaded after parsing argv."""
+    script = f"""
+import sys
+from gsa.main import ARGS_ROOT
+ARGS_ROOT.parse_args({argv!r})
+print(','.join(m for m in {modules!r} if m in sys.modules))
+"""
+    out = subprocess.run([sys.executable, '-c', script], check=True,
+                         capture_output=True, text=True).stdout
+    return [m for m in out.strip().split(',') if m]
+
+
+def test_lazy_imports() -> None:
+    assert loaded(['cache', 'ls'], HEAVY) == []
+
+
+def test_lazy_engine_imports() -> None:
+    argv = ['search', 'genome.fa', 'reads.fq', 'exact', 'naive']
+    assert loaded(argv, HEAVY_ENGINES) == []
@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+from gsa import timings
+
+
+def test_phases_exclude_nested_time(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Start from, and afterwards restore, the module's state
+    for name, value in (('_enabled', False), ('_start', (0.0, 0.0)),
+                        ('_totals', {}), ('_stack', [])):
+        monkeypatch.setattr(timings, name, value)
+    timings.enable()
+    with timings.phase('outer'):
+        time.sleep(0.02)
+        for _ in timings.timed_iter('inner', [1, 2, 3]):
+            timings.timed('leaf', time.sleep)(0.01)
+    res = timings.results()
+    assert list(res) == ['inner', 'leaf', 'outer', 'other', 'total']
+    assert res['inner'].calls == 3
+    assert res['leaf'].calls == 3
+    assert res['leaf'].wall >= 0.03
+    assert res['outer'].wall >= 0.02
+    assert res['total'].wall >= res['outer'].wall + res['leaf'].wall
+    assert abs(sum(t.wall for name, t in res.items() if name != 'total')
+               - res['total'].wall) < 1e-6
+
+
+def test_disabled_is_transparent(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(timings, '_enabled', False)
+    xs = [1, 2]
+    assert timings.timed_iter('x', xs) is xs
+    assert timings.timed('x', len) is len
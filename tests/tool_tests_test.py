@@ -0,0 +1,30 @@
+import os
+import stat
+import typing
+
+from gsa import tool_tests
+
+
+def test_stamp_key(tmp_path: typing.Any) -> None:
+    cwd = str(tmp_path)
+    tool = os.path.join(cwd, "tool")
+    with open(tool, 'w') as f:
+        f.write("#!/bin/sh\n")
+    os.chmod(tool, os.stat(tool).st_mode | stat.S_IXUSR)
+    with open(os.path.join(cwd, "genome.fa"), 'w') as f:
+        f.write(">chr1\nacgt\n")
+
+    key = tool_tests.stamp_key("./tool genome.fa -o out.sam", cwd, [],
+                               output="out.sam")
+    assert key is not None
+    # The files a command names are part of its key
+    with open(os.path.join(cwd, "genome.fa"), 'w') as f:
+        f.write(">chr1\nacgg\n")
+    tool_tests._digest.cache_clear()
+    assert tool_tests.stamp_key("./tool genome.fa -o out.sam", cwd, [],
+                                output="out.sam") != key
+
+    # Commands where we can't tell what runs are never up to date
+    assert tool_tests.stamp_key("python3 map.py", cwd, []) is None
+    assert tool_tests.stamp_key("./missing genome.fa", cwd, []) is None
+    assert tool_tests.stamp_key("cd sub && ./tool", cwd, []) is None
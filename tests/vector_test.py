@@ -0,0 +1,30 @@
+import random
+import numpy as np
+
+from gsa import vector
+
+
+def naive(x: str, p: str) -> list[int]:
+    return [i for i in range(len(x) - len(p) + 1) if x[i:i+len(p)] == p]
+
+
+def test_window_hashes() -> None:
+    x = vector.encode("acgtacgtaacc")
+    for m in range(1, len(x) + 1):
+        hashes = vector.window_hashes(x, m)
+        windows = [x[i:i+m] for i in range(len(x) - m + 1)]
+        assert list(hashes) == list(vector.read_hashes(np.array(windows)))
+
+
+def test_matcher() -> None:
+    for _ in range(20):
+        x = ''.join(random.choice("acgt") for _ in range(500))
+        matcher = vector.Matcher(x)
+        for m in [1, 3, 10, 32, 100]:
+            reads = [x[i:i+m] for i in range(0, len(x) - m, 37)]
+            reads.append(''.join(random.choice("acgt") for _ in range(m)))
+            assert matcher.search(reads) == [naive(x, p) for p in reads]
+
+    matcher = vector.Matcher("aaaa")
+    assert matcher.search(["aa", "b"*2]) == [[0, 1, 2], []]
+    assert matcher.search(["aaaaa"]) == [[]]
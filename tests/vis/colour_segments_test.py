@@ -1,6 +1,6 @@
 import random
-from gsa.vis.cols import green, red, blue
-from gsa.vis.colour_segments import colour
+from gsa.vis.cols import green, red, blue, plain
+from gsa.vis.colour_segments import colour, resolve_segments, ColourSegment
 
 
 def test_colour_segments() -> None:
@@ -26,6 +26,28 @@ def test_colour_segments() -> None:
         print(c)  # triggers the segment processing
 
 
+def test_resolve_segments() -> None:
+    segs = [ColourSegment(1, 5, green), ColourSegment(3, 8, red),
+            ColourSegment(6, 6, blue)]
+    runs = resolve_segments(10, segs)
+    assert [(r.start, r.stop) for r in runs] == \
+        [(0, 1), (1, 3), (3, 5), (5, 8), (8, 10)]
+    # Overlaps combine colours in the order they were added
+    assert [r.col.ansi_code for r in runs] == [
+        plain.ansi_code, green.ansi_code,
+        green.ansi_code + red.ansi_code, red.ansi_code, plain.ansi_code
+    ]
+
+
+def test_colour_cached() -> None:
+    c = colour("acgt")[1:3, green]
+    s = str(c)
+    assert str(c) is s
+    c[0, red]
+    assert str(c) != s
+    assert str(colour("acgt")) == "acgt"
+
+
 if __name__ == '__main__':
     for name, f in list(globals().items()):
         if name.startswith("test_"):
@@ -1,3 +1,5 @@
+import io
+
 from pystr.sais import sais
 
 from gsa.vis import cols
@@ -30,6 +32,35 @@ def rotation_table(x: str, sa: list[int]) -> Table:
     return tbl
 
 
+def test_widths_ignore_colours() -> None:
+    tbl = Table(L, R)
+    tbl.append_row(cols.green("ab"), "1")
+    tbl.append_row("abc", cols.red("22"))
+    assert tbl[0].widths == [2, 1]
+    tbl[0][0] = "abcd"
+    assert tbl[0].widths == [4, 1]
+    lines = str(tbl).split("\n")
+    assert [cols.strip_ansi(line) for line in lines] \
+        == ["abcd  1 ", "abc  22 "]
+
+
+def test_write() -> None:
+    tbl = Table(L, ColSpec(right_pad=""))
+    tbl.append_row("a", "b").append_row("ccc", "d")
+    out = io.StringIO()
+    tbl.write(out)
+    assert out.getvalue() == str(tbl) + "\n"
+
+
+def test_write_row() -> None:
+    tbl = Table(ColSpec(width=3), ColSpec(align=Align.RIGHT, width=4), L)
+    out = io.StringIO()
+    tbl.write_row(out, "a", "1", "x")
+    tbl.write_row(out, "abcde", "2")
+    assert out.getvalue() == "a      1 x \n" "abcde    2  \n"
+    assert len(tbl) == 0
+
+
 if __name__ == '__main__':
     for name, f in list(globals().items()):
         if name.startswith("test_"):